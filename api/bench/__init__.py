@@ -0,0 +1 @@
+"""Offline benchmark of the Verifai graph. Run with `python -m api.bench --help`"""
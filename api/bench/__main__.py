@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog="python -m api.bench",
+        description="Benchmark the Verifai graph and /verifai/run endpoint with offline stub providers"
+    )
+    parser.add_argument("--target", choices=["graph", "endpoint", "both"], default="both")
+    parser.add_argument("--modes", default="default,fast,high", help="Comma separated Verifai modes")
+    parser.add_argument("--concurrency", default="1,8", help="Comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=16, help="Runs per scenario")
+    parser.add_argument("--input", nargs="*", help="Text files to fact check, one text per file")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per stub model call")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Seconds per streamed report token")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="Seconds per stub search")
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0001, help="Seconds per prompt token of stub model calls")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Deterministic model latency variation (share of the latency)")
+    parser.add_argument("--evidence-budget", type=int, metavar="TOKENS", help="Evidence tokens per verdict prompt in every mode, 0 for whole snippets")
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache and evidence index enabled")
+    parser.add_argument("--record", metavar="PATH", help="Run against the real providers and record their responses")
+    parser.add_argument("--replay", metavar="PATH", help="Serve the responses of a recording, stubs fill the gaps")
+    parser.add_argument("--abandon", type=float, metavar="SECONDS", help="Disconnect every client after SECONDS and measure how fast the provider calls stop")
+    parser.add_argument("--startup", type=int, metavar="SAMPLES", help="Measure SAMPLES cold starts of a worker, with and without warm-up")
+    parser.add_argument("--baseline", metavar="PATH", help="JSON results of an earlier --startup run, fail on a regression")
+    parser.add_argument("--memory", type=int, metavar="CLAIMS", help="Measure the memory of runs of an input of about CLAIMS claims, every one researched")
+    parser.add_argument("--connections", type=int, metavar="REQUESTS", help="Measure the connections opened and memory allocated per request by pooled provider clients and by clients built per call")
+    parser.add_argument("--json", metavar="PATH", help="Write the results as JSON")
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    # Settings are read on first use, so the environment must be ready before the api modules are imported
+    if not args.record:
+        os.environ.setdefault("OPENAI_API_KEY", "offline")
+        os.environ.setdefault("TAVILY_API_KEY", "offline")
+    if not args.cache:
+        os.environ["CACHE_ENABLED"] = "false"
+        os.environ["EVIDENCE_INDEX_ENABLED"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def install_providers(args):
+    from api.features.verifai.llm import build_provider_model, set_model_factory
+    from api.features.verifai.search import get_search_client, set_search_client
+    from .replay import Recording, RecordingChatModel, RecordingSearchClient
+    from .stubs import ReplaySearchClient, StubChatModel
+
+    if args.record:
+        recording = Recording(args.record)
+        set_search_client(RecordingSearchClient(get_search_client(), recording))
+        set_model_factory(lambda model_name, temperature: RecordingChatModel(
+            build_provider_model(model_name, temperature),
+            recording
+        ))
+        return recording
+
+    recording = Recording(args.replay) if args.replay else None
+    set_model_factory(lambda model_name, temperature: StubChatModel(
+        model_name=model_name,
+        latency=args.llm_latency,
+        token_latency=args.token_latency,
+        prompt_token_latency=args.prompt_token_latency,
+        jitter=args.jitter,
+        recording=recording
+    ))
+    set_search_client(ReplaySearchClient(recording, latency=args.search_latency))
+    return recording
+
+
+def configure_modes(args):
+    from api.features.verifai.config import get_config
+    from api.features.verifai.models import VerifaiModeEnum
+
+    if args.evidence_budget is not None:
+        for mode in VerifaiModeEnum:
+            get_config(mode).evidence_token_budget = args.evidence_budget or None
+
+
+def load_texts(args):
+    from .runner import DEFAULT_TEXTS
+    if not args.input:
+        return DEFAULT_TEXTS
+    texts = []
+    for path in args.input:
+        with open(path) as file:
+            texts.append(file.read())
+    return tuple(texts)
+
+
+async def abandon(args, texts):
+    from .runner import run_abandoned
+
+    results = []
+    print(f"{'mode':<9}{'runs':>5}{'in flight':>10}{'drain ms':>10}{'calls after':>12}{'errors':>7}")
+    for mode in args.modes.split(","):
+        result = await run_abandoned(mode, args.requests, args.abandon, texts)
+        results.append(result)
+        print(
+            f"{mode:<9}{args.requests:>5}{result['outbound_at_disconnect']:>10}{result['drain_ms']:>10.1f}"
+            f"{result['calls_after_disconnect']:>12}{len(result['errors']):>7}"
+        )
+    return results
+
+
+STARTUP_TOLERANCE = 1.2  # Slowdown over the baseline reported as a regression
+
+
+def startup(args) -> int:
+    from .startup import METRICS, measure_startup
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = {result["warm_up"]: result for result in json.load(file)}
+    results = []
+    regressions = []
+    print(f"{'warm-up':<9}{'import':>8}{'ready':>8}{'health':>8}{'1st run':>9}{'2nd run':>9}{'errors':>7}  (median ms)")
+    for warm_up in (False, True):
+        result = measure_startup(args.startup, warm_up)
+        results.append(result)
+        print(
+            f"{str(warm_up).lower():<9}{result['import_ms']:>8.0f}{result['ready_ms']:>8.0f}{result['health_ms']:>8.0f}"
+            f"{result['first_run_ms']:>9.0f}{result['second_run_ms']:>9.0f}{len(result['errors']):>7}"
+        )
+        for metric in METRICS:
+            before = baseline.get(warm_up, {}).get(metric)
+            if before and result[metric] > before * STARTUP_TOLERANCE:
+                regressions.append(f"{metric} with warm-up {str(warm_up).lower()}: {before:.0f} -> {result[metric]:.0f} ms")
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    for regression in regressions:
+        print(f"  regression: {regression}")
+    return 1 if regressions else 0
+
+
+def memory(args):
+    from .memory import measure_memory
+
+    targets = ["graph", "endpoint"] if args.target == "both" else [args.target]
+    results = []
+    print(f"{'target':<9}{'mode':<9}{'claims':>7}{'p50':>8}{'rss MB':>8}{'rss +MB':>8}{'alloc MB':>9}{'kept KB':>8}{'errors':>7}")
+    for target in targets:
+        for mode in args.modes.split(","):
+            result = measure_memory(target, mode, args.memory, args.requests)
+            results.append(result)
+            print(
+                f"{target:<9}{mode:<9}{result['claims']:>7}{result['latency']:>8.2f}{result['peak_rss_mb']:>8.1f}"
+                f"{result['rss_growth_mb']:>8.1f}{result['peak_alloc_mb']:>9.1f}{result['kept_kb']:>8.0f}{len(result['errors']):>7}"
+            )
+            for error in set(result["errors"]):
+                print(f"  error: {error}")
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+def connections(args):
+    from .connections import CLAIMS, measure_connections
+
+    results = []
+    print(f"{'clients':<10}{'requests':>9}{'calls/req':>10}{'conns/req':>10}{'alloc KB':>9}{'kept KB':>8}{'p50 ms':>8}  ({CLAIMS} claims per request)")
+    for strategy in ("pooled", "per_call"):
+        result = measure_connections(strategy, args.connections)
+        results.append(result)
+        print(
+            f"{strategy:<10}{result['requests']:>9}{result['calls_per_request']:>10}{result['connections_per_request']:>10.1f}"
+            f"{result['peak_alloc_kb']:>9.0f}{result['kept_kb']:>8.1f}{result['latency_ms']:>8.0f}"
+        )
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+async def main(args):
+    from .runner import run_scenario
+
+    recording = install_providers(args)
+    configure_modes(args)
+    texts = load_texts(args)
+    if args.abandon:
+        results = await abandon(args, texts)
+        if args.json:
+            with open(args.json, "w") as file:
+                json.dump(results, file, indent=2)
+        return
+    targets = ["graph", "endpoint"] if args.target == "both" else [args.target]
+    results = []
+    print(f"{'target':<9}{'mode':<9}{'conc':>5}{'rps':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'ttfe50':>8}{'ttfe95':>8}{'ttfc50':>8}{'ttfv50':>8}{'srch/cl':>8}{'vtok/cl':>8}{'vms/cl':>8}{'rss MB':>8}{'errors':>7}")
+    for target in targets:
+        for mode in args.modes.split(","):
+            for concurrency in [int(level) for level in args.concurrency.split(",")]:
+                result = await run_scenario(target, mode, concurrency, args.requests, texts)
+                results.append(result)
+                print(
+                    f"{target:<9}{mode:<9}{concurrency:>5}{result['rps']:>8.2f}"
+                    f"{result['latency_p50']:>8.2f}{result['latency_p95']:>8.2f}{result['latency_p99']:>8.2f}"
+                    f"{result['ttfe_p50']:>8.2f}{result['ttfe_p95']:>8.2f}"
+                    f"{result['ttfc_p50']:>8.2f}{result['ttfv_p50']:>8.2f}{result['searches_per_claim']:>8.2f}"
+                    f"{result['verify_tokens_per_claim']:>8.0f}{result['verify_ms_per_claim']:>8.0f}{result['peak_rss_mb']:>8.1f}{len(result['errors']):>7}"
+                )
+                for error in set(result["errors"]):
+                    print(f"  error: {error}")
+
+    if args.record:
+        recording.save()
+        print(f"Recorded {len(recording.entries)} responses to {args.record}")
+    elif recording:
+        print(f"Replayed {recording.hits} recorded responses, {recording.misses} served by the stubs")
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    if arguments.startup:
+        sys.exit(startup(arguments))  # Every start is measured in a new process, this one stays unconfigured
+    if arguments.memory:
+        memory(arguments)  # Every mode is measured in a new process too
+        sys.exit()
+    if arguments.connections:
+        connections(arguments)  # Same for each client strategy, against a local stand-in for the providers
+        sys.exit()
+    configure_environment(arguments)
+    asyncio.run(main(arguments))
@@ -0,0 +1,175 @@
+"""Provider clients cost per request: TCP connections opened and memory allocated, pooled clients against
+clients built for every call (as the nodes did before the model registry).
+
+A local server stands in for the OpenAI and Tavily HTTP APIs and counts the connections opened to it. Against
+the real APIs, each of them is also a TLS handshake. Each strategy is measured in a new interpreter, run as a
+module it measures one strategy and prints it as JSON. `measure_connections` runs it and counts its connections.
+"""
+
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CLAIMS = 10  # Claims researched per request: one search queries call, then a search per query
+MODEL = "openai:gpt-4o-mini"
+QUERIES = ["first query", "second query"]
+
+
+class ProviderServer(ThreadingHTTPServer):
+    """Keep-alive HTTP server answering chat completions and searches, in a background thread"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _ProviderHandler)
+        self.connections = 0
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def get_request(self):
+        self.connections += 1  # Accepted one at a time, by the serving thread
+        return super().get_request()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class _ProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Connections stay open between requests unless the client closes them
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith("/chat/completions"):
+            body = {
+                "id": "bench", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+                "choices": [{
+                    "index": 0, "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": json.dumps({"queries": QUERIES})},
+                }],
+                "usage": {"prompt_tokens": 60, "completion_tokens": 12, "total_tokens": 72},
+            }
+        else:
+            body = {
+                "query": "", "response_time": 0.0,
+                "results": [{"url": f"https://example.com/{i}", "title": "", "content": "Snippet", "score": 0.5} for i in range(3)],
+            }
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _clients(strategy: str, base_url: str):
+    """(structured model, search client) getters of a strategy"""
+    from tavily import AsyncTavilyClient
+    from api.common.http import get_http_client
+    from api.features.verifai.llm import get_structured_model
+    from api.features.verifai.models import SearchQueries
+    from api.settings import get_settings
+
+    api_key = get_settings().TAVILY_API_KEY
+    if strategy == "pooled":
+        search_client = AsyncTavilyClient(api_key=api_key, api_base_url=base_url, client=get_http_client("tavily"))
+        return lambda: get_structured_model(MODEL, 0.0, SearchQueries), lambda: search_client
+
+    from langchain.chat_models import init_chat_model
+
+    def model():
+        return init_chat_model(api_key=get_settings().OPENAI_API_KEY, model=MODEL, temperature=0.0).with_structured_output(SearchQueries)
+    return model, lambda: AsyncTavilyClient(api_key=api_key, api_base_url=base_url)
+
+
+async def _measure(strategy: str, requests: int, base_url: str) -> dict:
+    model, search_client = _clients(strategy, base_url)
+
+    async def research(claim: str):
+        result = await model().ainvoke(f"Search queries for: {claim}")
+        await asyncio.gather(*[search_client().search(query=query, max_results=3) for query in result.queries])
+
+    async def request(number: int):
+        await asyncio.gather(*[research(f"Claim {number}.{i}") for i in range(CLAIMS)])
+
+    await request(-1)  # Imports and first connections, left out of the measures
+    print("ready", flush=True)
+    sys.stdin.readline()  # The parent counts the connections from here
+
+    latencies = []
+    for number in range(requests):
+        started = time.perf_counter()
+        await request(number)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+
+    tracemalloc.start()
+    allocated, kept = [], []
+    for number in range(requests):
+        gc.collect()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        await request(requests + number)
+        allocated.append(tracemalloc.get_traced_memory()[1] - before)
+        gc.collect()
+        kept.append(tracemalloc.get_traced_memory()[0] - before)
+    tracemalloc.stop()
+    return {
+        "strategy": strategy,
+        "requests": requests * 2,  # Timed, then traced
+        "calls_per_request": CLAIMS * (1 + len(QUERIES)),
+        "latency_ms": latencies[len(latencies) // 2] * 1000,
+        "peak_alloc_kb": sum(allocated) / len(allocated) / 1024,
+        "kept_kb": sum(kept) / len(kept) / 1024,
+    }
+
+
+def measure_connections(strategy: str, requests: int) -> dict:
+    """Connections opened and memory allocated per request of `CLAIMS` claims, in a new interpreter"""
+    with ProviderServer() as server:
+        env = {
+            **os.environ,
+            "OPENAI_API_KEY": "offline",
+            "TAVILY_API_KEY": "offline",
+            "OPENAI_API_BASE": f"{server.url}/v1",
+            "OPENAI_RATE_LIMIT": "0",
+            "TAVILY_RATE_LIMIT": "0",
+            "LOG_LEVEL": "WARNING",
+        }
+        process = subprocess.Popen(
+            [sys.executable, "-m", "api.bench.connections", strategy, str(requests), server.url],
+            env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        if process.stdout.readline().strip() != "ready":
+            process.kill()
+            raise RuntimeError(f"{strategy} benchmark failed to start")
+        connections = server.connections
+        process.stdin.write("\n")
+        process.stdin.flush()
+        output, _ = process.communicate()
+        if process.returncode:
+            raise RuntimeError(f"{strategy} benchmark exited with status {process.returncode}")
+        result = json.loads(output.strip().splitlines()[-1])
+        result["connections_per_request"] = (server.connections - connections) / result["requests"]
+    return result
+
+
+if __name__ == "__main__":
+    strategy, requests, base_url = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+    print(json.dumps(asyncio.run(_measure(strategy, requests, base_url))))
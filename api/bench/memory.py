@@ -0,0 +1,116 @@
+"""Memory of large fact-check runs: peak RSS and allocations per request, each mode in a fresh process.
+
+Run as a module, it measures one mode and prints it as JSON. `measure_memory` runs it for several modes.
+"""
+
+import asyncio
+import gc
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+CLAIMS_PER_CHUNK = 6  # Claims the stub extracts from each chunk of the input
+
+
+def large_text(claims: int, chunk_chars: int) -> str:
+    """Text the stub extracts about `claims` distinct claims from. Every sentence has its own numbers,
+    so none are clustered as near-duplicates"""
+    sentences = []
+    size = 0
+    i = 0
+    while size < math.ceil(claims / CLAIMS_PER_CHUNK) * chunk_chars:
+        sentence = f"Harbour {i} handled {1000 + 37 * i} containers and {20 + i % 50} ships in {1950 + i}."
+        sentences.append(sentence)
+        size += len(sentence) + 1
+        i += 1
+    return " ".join(sentences)
+
+
+async def _measure(target: str, mode: str, claims: int, requests: int) -> dict:
+    from api.features.verifai.config import get_config
+    from api.features.verifai.graph import build_graph
+    from api.features.verifai.llm import set_model_factory
+    from api.features.verifai.search import set_search_client
+    from .runner import peak_rss_mb, run_endpoint, run_graph
+    from .stubs import ReplaySearchClient, StubChatModel
+
+    set_model_factory(lambda model_name, temperature: StubChatModel(
+        model_name=model_name, latency=0.05, token_latency=0.0
+    ))
+    set_search_client(ReplaySearchClient(latency=0.05))
+    config = get_config(mode)
+    config.max_claims = None  # Every claim gets researched, the fan-out is as wide as the input
+    text = large_text(claims, config.extraction_chunk_chars)
+
+    from api.main import app
+    async with app.router.lifespan_context(app):  # Checkpointed graph and run log, as served
+        if target == "graph":
+            graph = build_graph()
+            run = lambda: run_graph(graph, mode, text)
+        else:
+            run = lambda: run_endpoint(app, mode, text)
+        warm_up = await run()  # Imports, models and compiled graphs, left out of the measures
+        gc.collect()
+        rss_before = peak_rss_mb()
+        results = [await run() for _ in range(requests)]
+        rss_peak = peak_rss_mb()
+        latencies = sorted(result.latency for result in results)  # Tracing slows the runs down, they are not timed
+
+        tracemalloc.start()
+        allocated, kept = [], []
+        for _ in range(requests):
+            gc.collect()
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            results.append(await run())
+            allocated.append(tracemalloc.get_traced_memory()[1] - before)
+            gc.collect()
+            kept.append(tracemalloc.get_traced_memory()[0] - before)
+        tracemalloc.stop()
+
+    return {
+        "target": target,
+        "mode": mode,
+        "requests": requests,
+        "input_chars": len(text),
+        "claims": warm_up.claims,
+        "latency": latencies[len(latencies) // 2],
+        "errors": [result.error for result in [warm_up, *results] if result.error],
+        "peak_rss_mb": rss_peak,
+        "rss_growth_mb": rss_peak - rss_before,
+        "peak_alloc_mb": max(allocated) / 1024 / 1024,
+        "kept_kb": max(kept) / 1024,
+    }
+
+
+def measure_memory(target: str, mode: str, claims: int, requests: int) -> dict:
+    """Memory of `requests` runs of a text of about `claims` claims, in a new interpreter with empty stores"""
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            "WARM_UP": "false",
+            # Rate limits would only stretch the runs, what is measured is the memory of the whole fan-out in flight
+            "OPENAI_RATE_LIMIT": "0",
+            "TAVILY_RATE_LIMIT": "0",
+            "RUNS_PATH": os.path.join(directory, "runs.sqlite3"),
+            "JOBS_PATH": os.path.join(directory, "jobs.sqlite3"),
+        }
+        output = subprocess.run(
+            [sys.executable, "-m", "api.bench.memory", target, mode, str(claims), str(requests)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("OPENAI_API_KEY", "offline")
+    os.environ.setdefault("TAVILY_API_KEY", "offline")
+    os.environ["CACHE_ENABLED"] = "false"
+    os.environ["EVIDENCE_INDEX_ENABLED"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    target, mode, claims, requests = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+    print(json.dumps(asyncio.run(_measure(target, mode, claims, requests))))
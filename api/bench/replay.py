@@ -0,0 +1,87 @@
+"""Recording of real provider responses, replayed by the benchmark stubs"""
+
+import json
+import os
+from typing import Any
+
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+from api.common.cache import make_key
+
+
+def prompt_text(input: Any) -> str:
+    """Text of a model input (prompt value, messages or plain string), used to key recorded responses"""
+    if hasattr(input, "to_string"):
+        return input.to_string()
+    if isinstance(input, list):
+        return "\n".join(str(getattr(message, "content", message)) for message in input)
+    return str(input)
+
+
+class Recording:
+    """Provider responses keyed by their request, persisted as a JSON file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(path):
+            with open(path) as file:
+                self.entries = json.load(file)
+
+    def get(self, kind: str, *parts: Any) -> Any:
+        value = self.entries.get(make_key(kind, *parts))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, kind: str, value: Any, *parts: Any):
+        self.entries[make_key(kind, *parts)] = value
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w") as file:
+            json.dump(self.entries, file)
+
+
+class RecordingChatModel(Runnable):
+    """Real chat model whose responses are saved to a recording"""
+
+    def __init__(self, model: Runnable, recording: Recording):
+        self.model = model
+        self.recording = recording
+
+    def invoke(self, input, config: RunnableConfig | None = None, **kwargs):
+        raise NotImplementedError("The Verifai graph only calls models asynchronously")
+
+    async def ainvoke(self, input, config: RunnableConfig | None = None, **kwargs):
+        message = await self.model.ainvoke(input, config, **kwargs)
+        self.recording.put("chat", message.content, prompt_text(input))
+        return message
+
+    def with_structured_output(self, schema, **kwargs) -> Runnable:
+        structured = self.model.with_structured_output(schema, **kwargs)
+
+        async def call(input, config: RunnableConfig):
+            output = await structured.ainvoke(input, config)
+            self.recording.put("structured", output.model_dump(mode="json"), schema.__name__, prompt_text(input))
+            return output
+        return RunnableLambda(call, name=f"recorded_{schema.__name__}")
+
+
+class RecordingSearchClient:
+    """Real search client whose results are saved to a recording"""
+
+    def __init__(self, client, recording: Recording):
+        self.client = client
+        self.recording = recording
+        self.calls = 0
+
+    async def search(self, query: str, max_results: int = 5, search_depth: str = "basic", **kwargs) -> dict:
+        self.calls += 1
+        results = await self.client.search(query=query, max_results=max_results, search_depth=search_depth, **kwargs)
+        self.recording.put("search", results, query, max_results, search_depth)
+        return results
@@ -0,0 +1,264 @@
+"""Drive the Verifai graph and the /verifai/run endpoint at a given concurrency and summarize the timings"""
+
+import asyncio
+import json
+import math
+import resource
+import sys
+import time
+from dataclasses import dataclass
+from uuid import uuid4
+
+from api.common.limiter import current_request_id
+from api.common.tasks import RunTasks, current_tasks
+from api.features.verifai.config import get_config
+from api.features.verifai.graph import build_graph
+from api.features.verifai.scheduler import scheduler_stats
+from api.features.verifai.search import get_search_client
+from .stubs import usage
+
+VERIFY_SCHEMAS = ("VerdictOutput", "ClaimVerdictsOutput")  # Structured outputs of the verdict calls
+
+_PARAGRAPH = (
+    "The Eiffel Tower was completed in 1889 and is 330 metres tall. "
+    "Paris hosted the Summer Olympic Games in 1900, 1924 and 2024. "
+    "France has a population of about 68 million people. "
+    "The Louvre is the most visited museum in the world with 8.7 million visitors in 2023. "
+)
+
+DEFAULT_TEXTS = (
+    "The Great Wall of China is visible from space with the naked eye.",
+    _PARAGRAPH,
+    # Long enough to be extracted in several chunks
+    " ".join(_PARAGRAPH.replace("2023", str(2000 + i)) for i in range(24)),
+)
+
+
+@dataclass
+class RunResult:
+    latency: float
+    first_event: float | None  # Seconds until the first graph event reached the caller
+    events: int
+    claims: int = 0  # Claims researched, counted once however many research rounds they took
+    first_claim: float | None = None  # Seconds until the first claim was streamed
+    first_verdict: float | None = None  # Seconds until the first verdict (or its status) was streamed
+    error: str | None = None
+
+    def observe(self, event: str | None, elapsed: float):
+        if self.first_claim is None and event and event.startswith(("extract_claims_item", "extract_claims_chunk", "extract_claims_end")):
+            self.first_claim = elapsed
+        if self.first_verdict is None and event and event.startswith(("verify_evidence_status_", "verify_evidence_end_")):
+            self.first_verdict = elapsed
+
+
+def _claim_index(event: str | None) -> str | None:
+    prefix = "research_evidence_start_"
+    return event[len(prefix):] if event and event.startswith(prefix) else None
+
+
+async def run_graph(graph, mode: str, text: str) -> RunResult:
+    current_request_id.set(uuid4().hex)
+    tasks = RunTasks()
+    run_tasks = current_tasks.set(tasks)
+    started = time.perf_counter()
+    first_event = None
+    events = 0
+    claims = set()
+    result = RunResult(0.0, None, 0)
+    try:
+        async for _, stream_mode, chunk in graph.astream(
+            {"input_text": text},
+            subgraphs=True,
+            stream_mode=["messages", "custom"],
+            context=get_config(mode)
+        ):
+            if stream_mode == "messages" and chunk[1].get("langgraph_node") != "generate_report":
+                continue  # Streamed structured outputs, the endpoint does not forward them either
+            events += 1
+            if first_event is None:
+                first_event = time.perf_counter() - started
+            if stream_mode == "custom":
+                result.observe(chunk.get("event"), time.perf_counter() - started)
+                if _claim_index(chunk.get("event")) is not None:
+                    claims.add(_claim_index(chunk.get("event")))
+    except Exception as error:
+        result.error = repr(error)
+    finally:
+        tasks.cancel()
+        current_tasks.reset(run_tasks)
+    result.latency = time.perf_counter() - started
+    result.first_event, result.events, result.claims = first_event, events, len(claims)
+    return result
+
+
+async def run_endpoint(app, mode: str, text: str, disconnect: asyncio.Event | None = None) -> RunResult:
+    """POST /verifai/run through the ASGI interface directly, so every streamed chunk is timed on arrival.
+    The client disconnects early when `disconnect` is set"""
+    body = json.dumps({"input_text": text, "mode": mode}).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/verifai/run",
+        "raw_path": b"/verifai/run",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "server": ("bench", 80),
+        "client": ("bench", 0),
+    }
+    finished = asyncio.Event()
+    requested = False
+    started = time.perf_counter()
+    result = RunResult(0.0, None, 0)
+    buffer = b""
+    claims = set()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        waits = [asyncio.ensure_future(event.wait()) for event in (finished, disconnect) if event is not None]
+        _, pending = await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+        for wait in pending:
+            wait.cancel()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal buffer
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            result.error = f"HTTP {message['status']}"
+        elif message["type"] == "http.response.body":
+            buffer += message.get("body", b"")
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if not line.strip():
+                    continue
+                event = json.loads(line).get("event")
+                if event == "start":
+                    continue  # The start line only echoes the input
+                if _claim_index(event) is not None:
+                    claims.add(_claim_index(event))
+                result.observe(event, time.perf_counter() - started)
+                result.events += 1
+                if result.first_event is None:
+                    result.first_event = time.perf_counter() - started
+
+    try:
+        await app(scope, receive, send)
+    except Exception as error:
+        result.error = repr(error)
+    finally:
+        finished.set()
+    result.latency = time.perf_counter() - started
+    result.claims = len(claims)
+    return result
+
+
+def _outbound_calls() -> tuple[int, int]:
+    """(calls in flight or queued, calls granted so far) across providers"""
+    stats = scheduler_stats().values()
+    return sum(s["in_flight"] + s["queue_depth"] for s in stats), sum(s["granted"] for s in stats)
+
+
+async def run_abandoned(mode: str, requests: int, abandon_after: float, texts=DEFAULT_TEXTS) -> dict:
+    """Start `requests` runs at once and disconnect every client after `abandon_after` seconds, then measure
+    how long their provider calls take to stop and how many start afterwards"""
+    from api.main import app
+    disconnect = asyncio.Event()
+    # Distinct texts, so the runs are not coalesced into one
+    runs = asyncio.gather(*[
+        run_endpoint(app, mode, f"{texts[i % len(texts)]} Run {i}.", disconnect) for i in range(requests)
+    ])
+    await asyncio.sleep(abandon_after)
+    disconnect.set()
+    left_at = time.perf_counter()
+    pending, granted = _outbound_calls()
+    while _outbound_calls()[0] and time.perf_counter() - left_at < 10:
+        await asyncio.sleep(0.001)
+    drain = time.perf_counter() - left_at
+    results = await runs
+    await asyncio.sleep(1.0)  # Anything still running would have started new calls by now
+    return {
+        "mode": mode,
+        "requests": requests,
+        "abandon_after": abandon_after,
+        "errors": [r.error for r in results if r.error is not None],
+        "outbound_at_disconnect": pending,
+        "drain_ms": drain * 1000,
+        "calls_after_disconnect": _outbound_calls()[1] - granted,
+    }
+
+
+def _verify_usage() -> tuple[int, int, float]:
+    """(calls, prompt tokens, seconds) of the stub verdict calls so far"""
+    entries = [usage[name] for name in VERIFY_SCHEMAS if name in usage]
+    return sum(e["calls"] for e in entries), sum(e["prompt_tokens"] for e in entries), sum(e["seconds"] for e in entries)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)), 1) - 1]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, kilobytes elsewhere
+
+
+async def run_scenario(target: str, mode: str, concurrency: int, requests: int, texts=DEFAULT_TEXTS) -> dict:
+    """Send `requests` runs, at most `concurrency` at once, cycling through `texts`"""
+    if target == "graph":
+        graph = build_graph()
+        run = lambda text: run_graph(graph, mode, text)
+    else:
+        from api.main import app
+        run = lambda text: run_endpoint(app, mode, text)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(text: str) -> RunResult:
+        async with semaphore:
+            return await run(text)
+
+    search_client = get_search_client()
+    searches = getattr(search_client, "calls", 0)
+    verify_before = _verify_usage()
+    started = time.perf_counter()
+    results = await asyncio.gather(*[bounded(texts[i % len(texts)]) for i in range(requests)])
+    elapsed = time.perf_counter() - started
+    searches = getattr(search_client, "calls", 0) - searches
+    verify_calls, verify_tokens, verify_seconds = [after - before for after, before in zip(_verify_usage(), verify_before)]
+    claims = sum(r.claims for r in results)
+    latencies = [r.latency for r in results if r.error is None]
+    first_events = [r.first_event for r in results if r.error is None and r.first_event is not None]
+    first_claims = [r.first_claim for r in results if r.error is None and r.first_claim is not None]
+    first_verdicts = [r.first_verdict for r in results if r.error is None and r.first_verdict is not None]
+    return {
+        "target": target,
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": [r.error for r in results if r.error is not None],
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "ttfe_p50": percentile(first_events, 50),
+        "ttfe_p95": percentile(first_events, 95),
+        "ttfe_p99": percentile(first_events, 99),
+        "ttfc_p50": percentile(first_claims, 50),
+        "ttfv_p50": percentile(first_verdicts, 50),
+        "events_avg": sum(r.events for r in results) / len(results) if results else 0.0,
+        "searches_per_claim": searches / claims if claims else 0.0,
+        "verify_calls_per_claim": verify_calls / claims if claims else 0.0,
+        "verify_tokens_per_claim": verify_tokens / claims if claims else 0.0,
+        "verify_ms_per_claim": verify_seconds * 1000 / claims if claims else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
@@ -0,0 +1,111 @@
+"""Cold start of a worker: import time, app startup and time to the first responses, each in a fresh process.
+
+Run as a module, it measures one start and prints it as JSON. `measure_startup` runs it several times.
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+METRICS = ("import_ms", "ready_ms", "health_ms", "first_run_ms", "second_run_ms")
+
+
+async def _get(app, path: str) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "server": ("bench", 80),
+        "client": ("bench", 0),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def _start(launched_at: float) -> dict:
+    elapsed = lambda: (time.time() - launched_at) * 1000
+    from api.main import app
+    timings = {"import_ms": elapsed()}
+
+    from api.features.verifai.llm import build_provider_model, set_model_factory
+    from .runner import DEFAULT_TEXTS, run_endpoint
+    from .stubs import ReplaySearchClient, StubChatModel
+    from api.features.verifai.search import set_search_client
+
+    def factory(model_name: str, temperature: float):
+        build_provider_model(model_name, temperature)  # Pays the provider SDK import and client setup, as in production
+        return StubChatModel(model_name=model_name, latency=0.0, token_latency=0.0)
+
+    # Providers answer instantly, what is left of a run is the app own work
+    set_model_factory(factory)
+    set_search_client(ReplaySearchClient(latency=0.0))
+    async with app.router.lifespan_context(app):
+        timings["ready_ms"] = elapsed()
+        status = await _get(app, "/health")
+        timings["health_ms"] = elapsed()
+        runs = []
+        for _ in range(2):
+            started = time.perf_counter()
+            runs.append(await run_endpoint(app, "default", DEFAULT_TEXTS[1]))
+            runs[-1].latency = (time.perf_counter() - started) * 1000
+        timings["first_run_ms"] = timings["health_ms"] + runs[0].latency
+        timings["second_run_ms"] = runs[1].latency
+        timings["errors"] = [run.error for run in runs if run.error] + ([f"/health HTTP {status}"] if status != 200 else [])
+    return timings
+
+
+def measure_startup(samples: int, warm_up: bool) -> dict:
+    """Median timings of `samples` cold starts, each in a new interpreter with empty run and job stores"""
+    results = []
+    for _ in range(samples):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                "WARM_UP": str(warm_up).lower(),
+                "RUNS_PATH": os.path.join(directory, "runs.sqlite3"),
+                "JOBS_PATH": os.path.join(directory, "jobs.sqlite3"),
+                "BENCH_LAUNCHED_AT": repr(time.time()),
+            }
+            output = subprocess.run(
+                [sys.executable, "-m", "api.bench.startup"], env=env, capture_output=True, text=True, check=True
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+    summary = {metric: statistics.median(result[metric] for result in results) for metric in METRICS}
+    return {
+        "warm_up": warm_up,
+        "samples": samples,
+        "errors": [error for result in results for error in result["errors"]],
+        **summary
+    }
+
+
+if __name__ == "__main__":
+    launched_at = float(os.environ["BENCH_LAUNCHED_AT"])
+    os.environ.setdefault("OPENAI_API_KEY", "offline")
+    os.environ.setdefault("TAVILY_API_KEY", "offline")
+    os.environ["CACHE_ENABLED"] = "false"
+    os.environ["EVIDENCE_INDEX_ENABLED"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    print(json.dumps(asyncio.run(_start(launched_at))))
@@ -0,0 +1,242 @@
+"""Deterministic offline providers for the benchmark: canned model outputs and replayed search results"""
+
+import asyncio
+import hashlib
+import re
+from typing import Any, AsyncIterator, Callable, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel
+
+from api.common.text import split_sentences
+from api.features.verifai.models import (
+    Claim,
+    ClaimsList,
+    SearchQueries,
+    VerdictOutput,
+    ClaimVerdictOutput,
+    ClaimVerdictsOutput
+)
+from .replay import Recording, prompt_text
+
+STATUSES = ("SUPPORTS", "REFUTES", "NOT ENOUGH INFO")
+
+# Calls, prompt tokens and seconds of the stub structured calls, per output schema name
+usage: dict[str, dict[str, float]] = {}
+
+
+def _unit(text: str) -> float:
+    """Deterministic pseudo-random number in [0, 1) derived from a text"""
+    return int(hashlib.sha256(text.encode()).hexdigest()[:8], 16) / 0x100000000
+
+
+def _tokens(text: str) -> int:
+    return len(text) // 4  # Rough count, 4 characters per token
+
+
+def _claims(text: str) -> ClaimsList:
+    # The text to fact check closes the extraction prompt, so its sentences are the last ones
+    sentences = [sentence for sentence in split_sentences(text) if len(sentence) > 20][-6:]
+    return ClaimsList(claims=[Claim(text=sentence, priority=1 + int(_unit(sentence) * 10)) for sentence in sentences])
+
+
+def _queries(text: str) -> SearchQueries:
+    claim = re.search(r"Claim: (.+)", text)
+    count = re.search(r"create (\d+) effective", text)
+    subject = claim.group(1) if claim else text[-80:]
+    suffixes = ("", "official figures", "fact check", "source", "history")
+    return SearchQueries(queries=[f"{subject} {suffix}".strip() for suffix in suffixes[:int(count.group(1)) if count else 3]])
+
+
+def _verdict(text: str) -> VerdictOutput:
+    unit = _unit(text)
+    # Confidence grows with the evidence given, as a real model's would, so that adaptive research escalates realistically
+    evidence = len(re.findall(r"Id: \d+, Source:", text))
+    return VerdictOutput(
+        status=STATUSES[int(unit * 2)] if evidence >= 2 else "NOT ENOUGH INFO",
+        confidence=round(min(0.45 + 0.1 * evidence + 0.3 * unit, 0.99), 2),
+        justification="Stub verdict",
+        evidence_ids_used=[0]
+    )
+
+
+def _verdicts(text: str) -> ClaimVerdictsOutput:
+    claim_ids = [int(claim_id) for claim_id in re.findall(r"Claim id: (\d+)", text)]
+    return ClaimVerdictsOutput(verdicts=[
+        ClaimVerdictOutput(claim_id=claim_id, **_verdict(f"{claim_id}{text}").model_dump())
+        for claim_id in claim_ids
+    ])
+
+
+# Canned structured output of each schema, computed from the prompt text
+RESPONDERS: dict[type[BaseModel], Callable[[str], BaseModel]] = {
+    ClaimsList: _claims,
+    SearchQueries: _queries,
+    VerdictOutput: _verdict,
+    ClaimVerdictsOutput: _verdicts,
+}
+
+
+def _responder(schema) -> Callable[[str], BaseModel]:
+    responder = RESPONDERS.get(schema)
+    if responder is None:
+        raise NotImplementedError(f"No stub response for {getattr(schema, '__name__', schema)}, add one to RESPONDERS")
+    return responder
+
+
+def _json_tokens(output: BaseModel) -> list[str]:
+    """Output JSON in pieces of about a token, the model generates them one at a time"""
+    return re.findall(r".{1,4}", output.model_dump_json(), re.DOTALL)
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model answering with canned (or recorded) outputs after a fixed, configurable latency.
+
+    Plain calls stream a report token by token so the `messages` stream mode behaves as with a real model.
+    Structured outputs take a token latency per token of their JSON, and stream it when requested as a tool call.
+    """
+    model_name: str = "stub"
+    latency: float = 0.2  # Seconds per call
+    token_latency: float = 0.005  # Seconds per streamed token
+    jitter: float = 0.0  # Deterministic latency variation, as a share of `latency`
+    prompt_token_latency: float = 0.0  # Seconds per prompt token, longer prompts take longer to process
+    report_words: int = 100  # Plus a word per 20 prompt characters
+    recording: Optional[Any] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "verifai-stub"
+
+    def with_structured_output(self, schema, **kwargs) -> Runnable:
+        _responder(schema)
+
+        async def call(input, config: RunnableConfig):
+            output, latency = self._structured(schema, prompt_text(input))
+            await asyncio.sleep(latency + self.token_latency * len(_json_tokens(output)))
+            return output
+        return RunnableLambda(call, name=f"stub_{schema.__name__}")
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs) -> Runnable:
+        """Structured outputs requested as a forced tool call, streamed as tool call chunks"""
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def _structured(self, schema, text: str) -> tuple[BaseModel, float]:
+        """Output of a structured call and its latency to the first token, recorded in `usage`"""
+        latency = self._latency(text)
+        entry = usage.setdefault(schema.__name__, {"calls": 0, "prompt_tokens": 0, "seconds": 0.0})
+        entry["calls"] += 1
+        entry["prompt_tokens"] += _tokens(text)
+        recorded = self.recording.get("structured", schema.__name__, text) if self.recording else None
+        output = schema.model_validate(recorded) if recorded is not None else _responder(schema)(text)
+        entry["seconds"] += latency + self.token_latency * len(_json_tokens(output))
+        return output, latency
+
+    async def _astream_tool_call(self, tools: list[dict], text: str) -> AsyncIterator[ChatGenerationChunk]:
+        name = tools[0]["function"]["name"]
+        schema = next((schema for schema in RESPONDERS if schema.__name__ == name), None)
+        output, latency = self._structured(schema, text)
+        started = asyncio.get_running_loop().time()
+        for i, token in enumerate(_json_tokens(output)):
+            # Paced from the start, so that the stream takes as long as the same call unstreamed
+            await asyncio.sleep(started + latency + (i + 1) * self.token_latency - asyncio.get_running_loop().time())
+            tool_call_chunk = {"name": name if i == 0 else None, "args": token, "id": "stub_call" if i == 0 else None, "index": 0}
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[tool_call_chunk]))
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("The Verifai graph only calls models asynchronously")
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs
+    ) -> ChatResult:
+        text = prompt_text(messages)
+        if kwargs.get("tools"):
+            chunks = [chunk async for chunk in self._astream_tool_call(kwargs["tools"], text)]
+            message = chunks[0].message
+            for chunk in chunks[1:]:
+                message += chunk.message
+            return ChatResult(generations=[ChatGeneration(message=message)])
+        await asyncio.sleep(self._latency(text))
+        content = self._report(text)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content, **self._metadata(text, content)))])
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        text = prompt_text(messages)
+        if kwargs.get("tools"):
+            async for chunk in self._astream_tool_call(kwargs["tools"], text):
+                if run_manager:
+                    await run_manager.on_llm_new_token("", chunk=chunk)
+                yield chunk
+            return
+        await asyncio.sleep(self._latency(text))
+        content = self._report(text)
+        tokens = re.findall(r"\S+\s*", content)
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(self.token_latency)
+            metadata = self._metadata(text, content) if i == len(tokens) - 1 else {}
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, **metadata))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def _latency(self, text: str) -> float:
+        return max(self.latency * (1 + self.jitter * (2 * _unit(text) - 1)), 0.0) + self.prompt_token_latency * _tokens(text)
+
+    def _report(self, text: str) -> str:
+        recorded = self.recording.get("chat", text) if self.recording else None
+        if recorded is not None:
+            return recorded
+        # Longer prompts (more verdicts to report) get longer answers, as with a real model
+        words = self.report_words + len(text) // 20
+        return "# Fact-check report\n\n" + " ".join(f"word{i}" for i in range(words))
+
+    def _metadata(self, text: str, content: str) -> dict:
+        # Rough token counts so that usage and cost instrumentation get exercised
+        return {
+            "usage_metadata": {
+                "input_tokens": _tokens(text),
+                "output_tokens": _tokens(content),
+                "total_tokens": _tokens(text) + _tokens(content),
+            },
+            "response_metadata": {"model_name": self.model_name},
+        }
+
+
+class ReplaySearchClient:
+    """Search backend serving recorded results, or deterministic synthetic ones, after a fixed latency"""
+
+    def __init__(self, recording: Recording | None = None, latency: float = 0.3):
+        self.recording = recording
+        self.latency = latency
+        self.calls = 0
+
+    async def search(self, query: str, max_results: int = 5, search_depth: str = "basic", **kwargs) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        recorded = self.recording.get("search", query, max_results, search_depth) if self.recording else None
+        if recorded is not None:
+            return recorded
+        digest = hashlib.sha256(query.encode()).hexdigest()[:10]
+        return {"query": query, "results": [
+            {
+                "url": f"https://example.org/{digest}/{i}",
+                "title": f"Result {i} for {query}",
+                "content": f"Synthetic evidence {i} about {query}. " * 8,
+                "score": round(0.95 - i * 0.1, 2),
+            }
+            for i in range(max_results)
+        ]}
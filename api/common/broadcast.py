@@ -0,0 +1,84 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Callable, Generic, Literal, TypeVar
+
+T = TypeVar("T")
+
+
+class Subscription(Generic[T]):
+    """Items published to a broadcast after the subscription, in a bounded queue"""
+
+    def __init__(self, broadcast: "Broadcast[T]"):
+        self.queue: deque[T] = deque()
+        self.dropped = False  # Fell behind with the "drop" overflow policy
+        self._broadcast = broadcast
+
+    async def follow(self) -> AsyncIterator[T]:
+        """Items as they are published, until the broadcast is closed or the subscription dropped"""
+        changed = self._broadcast._changed
+        try:
+            while True:
+                async with changed:
+                    await changed.wait_for(lambda: self.queue or self._broadcast.closed or self.dropped)
+                    if self.dropped:
+                        return
+                    batch = list(self.queue)
+                    self.queue.clear()
+                    changed.notify_all()  # Room for a blocked publisher
+                if not batch:
+                    return
+                for item in batch:
+                    yield item
+        finally:
+            self.leave()
+
+    def leave(self):
+        self._broadcast._leave(self)
+
+
+class Broadcast(Generic[T]):
+    """Fan-out of published items to subscribers, each through a queue of at most `max_queue` items.
+
+    When a subscriber falls behind, the publisher either waits for it ("block") or drops it ("drop").
+    `on_idle` is called when the last subscriber leaves before the broadcast is closed, e.g. to stop its producer.
+    """
+
+    def __init__(self, max_queue: int = 256, overflow: Literal["block", "drop"] = "drop", on_idle: Callable[[], None] | None = None):
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.on_idle = on_idle
+        self.closed = False
+        self.subscriptions: list[Subscription[T]] = []
+        self._changed = asyncio.Condition()
+
+    def subscribe(self) -> Subscription[T]:
+        subscription = Subscription(self)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    async def publish(self, items: list[T]):
+        async with self._changed:
+            for subscription in list(self.subscriptions):
+                if len(subscription.queue) >= self.max_queue:
+                    if self.overflow == "block":
+                        await self._changed.wait_for(
+                            lambda: len(subscription.queue) < self.max_queue or subscription not in self.subscriptions
+                        )
+                    else:
+                        subscription.dropped = True
+                        subscription.queue.clear()
+                        self._leave(subscription)
+                        continue
+                subscription.queue.extend(items)
+            self._changed.notify_all()
+
+    async def close(self):
+        async with self._changed:
+            self.closed = True
+            self._changed.notify_all()
+
+    def _leave(self, subscription: Subscription[T]):
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+            if not self.subscriptions and not self.closed and self.on_idle is not None:
+                self.on_idle()
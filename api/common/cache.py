@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable
+
+
+def make_key(namespace: str, *parts: Any) -> str:
+    """Content address of a cached result: namespace plus a digest of every input it depends on"""
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class ResultCache:
+    """Two tiers result cache: an in-memory LRU with TTL in front of an optional SQLite store.
+
+    Values must be JSON serializable (dump Pydantic models with `model_dump(mode="json")`).
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        max_entries: int = 1024,
+        ttl: float = 86400.0,
+        listener: Callable[[str, str], None] | None = None
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.listener = listener  # Called with (namespace, outcome) on every lookup
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._counters: dict[str, dict[str, int]] = defaultdict(lambda: {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+        self._memory_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+
+    async def get(self, namespace: str, *parts: Any) -> Any | None:
+        key = make_key(namespace, *parts)
+        found, value = self._memory_get(namespace, key)
+        if found:
+            return value
+        row = await asyncio.to_thread(self._disk_get, key) if self._db is not None else None
+        return self._disk_hit(namespace, key, row)
+
+    async def set(self, namespace: str, value: Any, *parts: Any):
+        key = make_key(namespace, *parts)
+        expires_at = time.time() + self.ttl
+        self._remember(key, expires_at, value)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, json.dumps(value), expires_at)
+
+    def stats(self) -> dict:
+        """Hit/miss counters per namespace"""
+        return {
+            "memory_entries": len(self._memory),
+            "namespaces": {namespace: dict(counters) for namespace, counters in self._counters.items()},
+        }
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def _memory_get(self, namespace: str, key: str) -> tuple[bool, Any]:
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.time():
+                    self._memory.move_to_end(key)
+                    self._count(namespace, "memory_hits")
+                    return True, value
+                del self._memory[key]
+        return False, None
+
+    def _disk_hit(self, namespace: str, key: str, row: tuple[str, float] | None) -> Any | None:
+        if row is None:
+            self._count(namespace, "misses")
+            return None
+        value = json.loads(row[0])
+        self._remember(key, row[1], value)
+        self._count(namespace, "disk_hits")
+        return value
+
+    def _count(self, namespace: str, outcome: str):
+        self._counters[namespace][outcome] += 1
+        if self.listener is not None:
+            self.listener(namespace, outcome)
+
+    def _remember(self, key: str, expires_at: float, value: Any):
+        with self._memory_lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> tuple[str, float] | None:
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+
+    def _disk_set(self, key: str, value: str, expires_at: float):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at)
+            )
+            self._db.commit()
@@ -0,0 +1,65 @@
+"""LangGraph state channels"""
+
+from typing import Any, Sequence
+
+from langgraph.channels.base import BaseChannel
+
+
+class AppendList(BaseChannel[list, Any, list]):
+    """List of the items written by every branch, a write being a list of items or a single one:
+    `Annotated[List[Verdict], AppendList]`.
+
+    Writes are appended in place, in amortized O(1) per item, where an `operator.add` reducer copies the
+    whole list for each write (quadratic in the number of parallel branches). Readers and checkpoints
+    get a copy, taken once per step that changed the list.
+    """
+
+    __slots__ = ("items", "snapshot")
+
+    def __init__(self, typ: Any = list):
+        super().__init__(typ)
+        self.items: list = []
+        self.snapshot: list | None = None
+
+    def __eq__(self, value: object) -> bool:
+        return isinstance(value, AppendList)
+
+    @property
+    def ValueType(self) -> Any:
+        return self.typ
+
+    @property
+    def UpdateType(self) -> Any:
+        return Any
+
+    def copy(self):
+        return self.from_checkpoint(self.get())
+
+    def from_checkpoint(self, checkpoint: list | Any):
+        channel = self.__class__(self.typ)
+        channel.key = self.key
+        if isinstance(checkpoint, list):  # Not a list when the channel was never written
+            channel.items = list(checkpoint)
+        return channel
+
+    def update(self, values: Sequence[Any]) -> bool:
+        if not values:
+            return False
+        for value in values:
+            if isinstance(value, list):
+                self.items.extend(value)
+            else:
+                self.items.append(value)
+        self.snapshot = None
+        return True
+
+    def get(self) -> list:
+        if self.snapshot is None:
+            self.snapshot = list(self.items)
+        return self.snapshot
+
+    def is_available(self) -> bool:
+        return True
+
+    def checkpoint(self) -> list:
+        return self.get()
@@ -0,0 +1,21 @@
+import httpx
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def get_http_client(provider: str) -> httpx.AsyncClient:
+    """Pooled keep-alive HTTP client shared by every call to the given provider"""
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60.0),
+            timeout=httpx.Timeout(120.0, connect=10.0)
+        )
+        _clients[provider] = client
+    return client
+
+
+async def close_http_clients():
+    while _clients:
+        _, client = _clients.popitem()
+        await client.aclose()
@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+from uuid import uuid4
+
+
+class JobStore:
+    """SQLite store of batch jobs: a queue of items per job, their progress and their results.
+
+    Items are claimed in submission order. Items sharing a dedup key within a job are run once,
+    the others get a copy of the result. A claimed item is leased: its worker renews the lease while
+    running it, an item whose lease ran out (worker gone) is claimed again. Several processes can
+    share a store. Methods are blocking, call them through `asyncio.to_thread`.
+    """
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, created_at REAL NOT NULL, updated_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                duplicate_of INTEGER,
+                result TEXT,
+                error TEXT,
+                lease_until REAL,
+                PRIMARY KEY (job_id, position)
+            );
+            CREATE INDEX IF NOT EXISTS job_items_status ON job_items (status);
+        """)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(job_items)")}
+        if "lease_until" not in columns:  # Store created before leases, its running items count as expired
+            self._db.execute("ALTER TABLE job_items ADD COLUMN lease_until REAL")
+        self._db.commit()
+
+    def create(self, items: list[tuple[dict, str]]) -> str:
+        """Queue a job of (payload, dedup key) items, returns the job id"""
+        job_id = uuid4().hex
+        now = time.time()
+        first_of: dict[str, int] = {}
+        rows = []
+        for position, (payload, dedup_key) in enumerate(items):
+            original = first_of.setdefault(dedup_key, position)
+            status = "pending" if original == position else "duplicate"
+            rows.append((job_id, position, json.dumps(payload), status, None if original == position else original))
+        with self._lock:
+            self._db.execute("INSERT INTO jobs (id, created_at, updated_at) VALUES (?, ?, ?)", (job_id, now, now))
+            self._db.executemany(
+                "INSERT INTO job_items (job_id, position, payload, status, duplicate_of) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._db.commit()
+        return job_id
+
+    def claim(self, lease_seconds: float) -> tuple[str, int, dict] | None:
+        """Oldest pending item or running one whose lease ran out, marked as running for `lease_seconds`"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "UPDATE job_items SET status = 'running', lease_until = ? "
+                "WHERE rowid = (SELECT rowid FROM job_items WHERE status = 'pending' "
+                "OR (status = 'running' AND (lease_until IS NULL OR lease_until < ?)) ORDER BY rowid LIMIT 1) "
+                "RETURNING job_id, position, payload",
+                (now + lease_seconds, now)
+            ).fetchone()
+            self._db.commit()
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    def renew(self, items: list[tuple[str, int]], lease_seconds: float):
+        """Extend the lease of (job id, position) items still running"""
+        with self._lock:
+            self._db.executemany(
+                "UPDATE job_items SET lease_until = ? WHERE job_id = ? AND position = ? AND status = 'running'",
+                [(time.time() + lease_seconds, job_id, position) for job_id, position in items]
+            )
+            self._db.commit()
+
+    def complete(self, job_id: str, position: int, result: Any) -> bool:
+        """Store an item result (and its duplicates'). Returns whether the whole job is finished"""
+        return self._finish(job_id, position, "done", json.dumps(result), None)
+
+    def fail(self, job_id: str, position: int, error: str) -> bool:
+        return self._finish(job_id, position, "failed", None, error)
+
+    def release(self, items: list[tuple[str, int]]):
+        """(job id, position) items stopped before the end go back to the queue"""
+        with self._lock:
+            self._db.executemany(
+                "UPDATE job_items SET status = 'pending', lease_until = NULL "
+                "WHERE job_id = ? AND position = ? AND status = 'running'",
+                items
+            )
+            self._db.commit()
+
+    def job(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._db.execute("SELECT created_at, updated_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+        total = sum(counts.values())
+        finished = counts.get("done", 0) + counts.get("failed", 0)
+        return {
+            "job_id": job_id,
+            "status": "done" if finished == total else "running" if finished or counts.get("running") else "pending",
+            "total": total,
+            "completed": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "created_at": job[0],
+            "updated_at": job[1],
+        }
+
+    def items(self, job_id: str, offset: int = 0, limit: int = 50) -> list[dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT position, payload, status, result, error FROM job_items WHERE job_id = ? "
+                "ORDER BY position LIMIT ? OFFSET ?",
+                (job_id, limit, offset)
+            ).fetchall()
+        return [
+            {
+                "position": position,
+                "input": json.loads(payload),
+                "status": "pending" if status == "duplicate" else status,
+                "result": json.loads(result) if result is not None else None,
+                "error": error,
+            }
+            for position, payload, status, result, error in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _finish(self, job_id: str, position: int, status: str, result: str | None, error: str | None) -> bool:
+        with self._lock:
+            self._db.execute(
+                "UPDATE job_items SET status = ?, result = ?, error = ? "
+                "WHERE job_id = ? AND (position = ? OR duplicate_of = ?)",
+                (status, result, error, job_id, position, position)
+            )
+            self._db.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+            self._db.commit()
+            unfinished = self._db.execute(
+                "SELECT 1 FROM job_items WHERE job_id = ? AND status NOT IN ('done', 'failed') LIMIT 1", (job_id,)
+            ).fetchone()
+        return unfinished is None
@@ -0,0 +1,112 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+# Identifies the request a call is made for, so that queued calls are served fairly between requests
+current_request_id: ContextVar[str] = ContextVar("current_request_id", default="anonymous")
+# Priority of the work a call is made for, higher priority calls of a request are served first
+current_priority: ContextVar[int] = ContextVar("current_priority", default=0)
+
+
+class ProviderLimiter:
+    """Token bucket rate limit and maximum in-flight calls for one provider.
+
+    Waiting calls are served round-robin between requests, so a request with hundreds of queued
+    calls cannot starve smaller ones. Within a request, higher priority calls are served first.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_in_flight: int):
+        self.name = name
+        self.rate = rate  # Calls per second, 0 disables the rate limit
+        self.burst = max(burst, 1)
+        self.max_in_flight = max_in_flight
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        self._queues: dict[str, list[tuple[int, int, asyncio.Future]]] = {}
+        self._turns: deque[str] = deque()
+        self._sequence = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self._timer_loop: asyncio.AbstractEventLoop | None = None
+        self._granted = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @asynccontextmanager
+    async def slot(self, priority: int | None = None):
+        """Wait for a call slot, hold it for the duration of the block"""
+        started = time.monotonic()
+        await self._acquire(current_request_id.get(), current_priority.get() if priority is None else priority)
+        waited = time.monotonic() - started
+        self._granted += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        try:
+            yield waited
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "queue_depth": sum(1 for queue in self._queues.values() for *_, waiter in queue if not waiter.done()),
+            "queued_requests": len(self._queues),
+            "granted": self._granted,
+            "wait_seconds_avg": self._wait_total / self._granted if self._granted else 0.0,
+            "wait_seconds_max": self._wait_max,
+        }
+
+    async def _acquire(self, request_id: str, priority: int):
+        waiter = asyncio.get_running_loop().create_future()
+        if request_id not in self._queues:
+            self._queues[request_id] = []
+            self._turns.append(request_id)
+        heapq.heappush(self._queues[request_id], (-priority, next(self._sequence), waiter))
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # Slot was granted while being cancelled
+            raise
+
+    def _release(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _dispatch(self):
+        while self._turns and self._in_flight < self.max_in_flight:
+            self._refill()
+            if self.rate > 0 and self._tokens < 1:
+                loop = asyncio.get_running_loop()
+                if self._timer is None or self._timer_loop is not loop:
+                    self._timer = loop.call_later((1 - self._tokens) / self.rate, self._on_timer)
+                    self._timer_loop = loop
+                return
+            request_id = self._turns.popleft()
+            queue = self._queues[request_id]
+            _, _, waiter = heapq.heappop(queue)
+            if queue:
+                self._turns.append(request_id)
+            else:
+                del self._queues[request_id]
+            if waiter.done():
+                continue  # Cancelled while waiting
+            if self.rate > 0:
+                self._tokens -= 1
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
@@ -0,0 +1,93 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+
+class RunLog:
+    """SQLite log of streamed runs: their input, status and every frame sent, so that a dropped stream can be replayed.
+
+    Methods are blocking, call them through `asyncio.to_thread`.
+    """
+
+    def __init__(self, path: str, ttl: float = 86400.0):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS run_events (
+                run_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                PRIMARY KEY (run_id, seq)
+            );
+        """)
+        expired = time.time() - ttl
+        self._db.execute("DELETE FROM run_events WHERE run_id IN (SELECT id FROM runs WHERE updated_at < ?)", (expired,))
+        self._db.execute("DELETE FROM runs WHERE updated_at < ?", (expired,))
+        self._db.commit()
+
+    def create(self, run_id: str, payload: Any):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO runs (id, payload, status, created_at, updated_at) VALUES (?, ?, 'running', ?, ?)",
+                (run_id, json.dumps(payload), now, now)
+            )
+            self._db.commit()
+
+    def append(self, run_id: str, frames: list[tuple[int, str, bytes]]):
+        """Log (seq, event, payload JSON) frames"""
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO run_events (run_id, seq, event, payload) VALUES (?, ?, ?, ?)",
+                [(run_id, seq, event, payload) for seq, event, payload in frames]
+            )
+            self._db.execute("UPDATE runs SET updated_at = ? WHERE id = ?", (time.time(), run_id))
+            self._db.commit()
+
+    def set_status(self, run_id: str, status: str):
+        with self._lock:
+            self._db.execute("UPDATE runs SET status = ?, updated_at = ? WHERE id = ?", (status, time.time(), run_id))
+            self._db.commit()
+
+    def run(self, run_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload, status, created_at, updated_at, "
+                "(SELECT COUNT(*) FROM run_events WHERE run_id = id) FROM runs WHERE id = ?",
+                (run_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        payload, status, created_at, updated_at, events = row
+        return {
+            "run_id": run_id,
+            "input": json.loads(payload),
+            "status": status,
+            "events": events,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def events(self, run_id: str) -> list[tuple[int, str, bytes]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT seq, event, payload FROM run_events WHERE run_id = ? ORDER BY seq", (run_id,)
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
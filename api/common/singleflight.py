@@ -0,0 +1,46 @@
+import asyncio
+from typing import Any, Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent calls sharing a key: the first one runs, the others await its result (or error).
+
+    The call runs in its own task, so a cancelled caller does not cancel it for the others. It is
+    cancelled once every caller waiting for it is.
+    """
+
+    def __init__(self, listener: Callable[[str, str], None] | None = None):
+        self.listener = listener  # Called with (namespace, "coalesced") when a call joins one in flight
+        self._calls: dict[tuple, asyncio.Task] = {}
+        self._waiters: dict[tuple, int] = {}
+
+    async def do(self, namespace: str, fn: Callable[[], Awaitable[T]], *parts: Any) -> T:
+        key = (namespace, *parts)
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        elif self.listener is not None:
+            self.listener(namespace, "coalesced")
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                if not task.done():
+                    task.cancel()  # Nobody left waiting for it
+                    self._forget(key, task)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: tuple, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if task.done() and not task.cancelled():
+            task.exception()  # Retrieved, in case every caller is gone
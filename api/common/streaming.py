@@ -0,0 +1,40 @@
+import zlib
+from typing import AsyncIterator
+
+import anyio
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+class EventStreamResponse(StreamingResponse):
+    """Streaming response whose iterator is cancelled as soon as the client disconnects.
+
+    StreamingResponse only notices a disconnect when a send fails on recent ASGI servers, so a run
+    without frames to send for a while would keep running for nobody.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        async with anyio.create_task_group() as task_group:
+            async def stream():
+                try:
+                    await self.stream_response(send)
+                except OSError:
+                    pass  # Disconnected while sending
+                task_group.cancel_scope.cancel()
+
+            task_group.start_soon(stream)
+            await self.listen_for_disconnect(receive)
+            task_group.cancel_scope.cancel()
+
+
+def accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "").lower()
+
+
+async def gzip_frames(frames: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Gzip a stream frame by frame. Each frame is flushed on its own so that it can be decoded on arrival"""
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    async for frame in frames:
+        yield compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
@@ -0,0 +1,41 @@
+"""Background tasks a request starts ahead of the work that needs them"""
+
+import asyncio
+from contextvars import ContextVar
+from typing import Coroutine
+
+
+class RunTasks:
+    """Tasks of one run, cancelled together when the run stops (finished, cancelled or failed)"""
+
+    def __init__(self):
+        self._tasks: set[asyncio.Task] = set()
+        self._cancelled = False
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def spawn(self, coroutine: Coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coroutine)
+        if self._cancelled:
+            task.cancel()  # Started by a step still unwinding after the run stopped
+            return task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def cancel(self):
+        self._cancelled = True
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+
+# Tasks of the run in progress, set where a run starts
+current_tasks: ContextVar[RunTasks | None] = ContextVar("current_tasks", default=None)
+
+
+def spawn(coroutine: Coroutine) -> asyncio.Task:
+    """Task of the current run, a plain task when no run is tracked (graph invoked directly)"""
+    tasks = current_tasks.get()
+    return tasks.spawn(coroutine) if tasks is not None else asyncio.create_task(coroutine)
@@ -0,0 +1,157 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of a text used for content addressing (NFKC, collapsed whitespace)"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def shingles(text: str, size: int = 3) -> set[str]:
+    """Word n-grams of a text, used to detect near-duplicates"""
+    words = normalize_text(text).casefold().split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def char_shingles(text: str, size: int = 4) -> set[str]:
+    """Character n-grams of a text with case and punctuation removed, robust to small rephrasings of short texts"""
+    canonical = " ".join(_NON_WORD.sub(" ", normalize_text(text).casefold()).split())
+    if len(canonical) <= size:
+        return {canonical} if canonical else set()
+    return {canonical[i:i + size] for i in range(len(canonical) - size + 1)}
+
+
+_NEGATION = re.compile(r"\b(?:not|no|never|nor|none|neither|nobody|nothing|nowhere)\b|n['’]t\b")
+# Words that do not change what a claim states, the others must all be shared by grouped texts
+_FUNCTION_WORDS = frozenset(
+    "a an the of in on at to for by with from as and or but is are was were be been being has have had "
+    "do does did that this these those it its there their".split()
+)
+
+
+def content_words(text: str) -> set[str]:
+    """Words of a text other than function words, case and punctuation removed"""
+    words = _NON_WORD.sub(" ", normalize_text(text).casefold()).split()
+    return {word for word in words if word not in _FUNCTION_WORDS}
+
+
+def negations(text: str) -> list[str]:
+    """Negation markers of a text in order ("not", "never", "n't"...)"""
+    return _NEGATION.findall(normalize_text(text).casefold())
+
+
+def cluster_near_duplicates(texts: list[str], threshold: float) -> list[list[int]]:
+    """Group the indexes of texts whose character shingles overlap by at least `threshold` (Jaccard).
+
+    Grouped texts share a verdict, so texts that may state different facts are never grouped, whatever
+    their overlap: different numbers ("grew 3%" vs "grew 5%"), content words ("in Paris" vs "in Rome")
+    or negations ("is" vs "is not"). Groups are transitive and ordered by their first member, members
+    keep the input order.
+
+    >>> cluster_near_duplicates(["The Eiffel Tower is in Paris.", "the Eiffel tower is in Paris"], 0.9)
+    [[0, 1]]
+    >>> cluster_near_duplicates(["Biden won the 2020 election", "Trump won the 2020 election"], 0.5)
+    [[0], [1]]
+    >>> cluster_near_duplicates(["The Eiffel Tower is in Paris", "The Eiffel Tower is in Rome"], 0.5)
+    [[0], [1]]
+    >>> cluster_near_duplicates(["Paris is the capital of France", "Paris is not the capital of France"], 0.5)
+    [[0], [1]]
+    >>> cluster_near_duplicates(["Paris is the capital of France", "Paris isn't the capital of France"], 0.5)
+    [[0], [1]]
+    >>> cluster_near_duplicates(["Prices rose in 2023", "Prices fell in 2023"], 0.5)
+    [[0], [1]]
+    """
+    features = [char_shingles(text) for text in texts]
+    # Texts are grouped only when these are equal
+    keys = [(set(_NUMBER.findall(text)), content_words(text), negations(text)) for text in texts]
+    parents = list(range(len(texts)))
+
+    def find(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    for i in range(len(texts)):
+        for j in range(i + 1, len(texts)):
+            if find(i) != find(j) and keys[i] == keys[j] and jaccard(features[i], features[j]) >= threshold:
+                parents[find(j)] = find(i)
+
+    groups: dict[int, list[int]] = {}
+    for i in range(len(texts)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_sentences(text: str) -> list[str]:
+    return [sentence for sentence in _SENTENCE_END.split(text.strip()) if sentence]
+
+
+def split_chunks(text: str, max_chars: int, overlap_chars: int = 0) -> list[str]:
+    """Split a text into chunks of about `max_chars`, on paragraph then sentence boundaries.
+
+    Each chunk starts with the last sentences (up to `overlap_chars`) of the previous one, so that
+    statements spanning a boundary are seen whole at least once.
+    """
+    sentences: list[str] = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        sentences.extend(split_sentences(paragraph))
+
+    chunks: list[list[str]] = [[]]
+    size = 0
+    for sentence in sentences:
+        if chunks[-1] and size + len(sentence) > max_chars:
+            overlap: list[str] = []
+            for previous in reversed(chunks[-1]):
+                if sum(len(s) for s in overlap) + len(previous) > overlap_chars:
+                    break
+                overlap.insert(0, previous)
+            chunks.append(overlap)
+            size = sum(len(s) + 1 for s in overlap)
+        chunks[-1].append(sentence)
+        size += len(sentence) + 1
+    return [" ".join(chunk) for chunk in chunks if chunk]
+
+
+_WORD = re.compile(r"\w+")
+
+
+def bm25_scores(terms: list[str], documents: list[str], k1: float = 1.2, b: float = 0.75) -> list[float]:
+    """BM25 score of each document for the query `terms` (casefolded), the documents being the whole corpus"""
+    tokenized = [_WORD.findall(document.casefold()) for document in documents]
+    if not tokenized:
+        return []
+    average_length = sum(len(words) for words in tokenized) / len(tokenized) or 1.0
+    frequencies = [Counter(words) for words in tokenized]
+    scores = [0.0] * len(documents)
+    for term in set(terms):
+        containing = sum(1 for counts in frequencies if term in counts)
+        if not containing:
+            continue
+        idf = math.log(1 + (len(documents) - containing + 0.5) / (containing + 0.5))
+        for i, counts in enumerate(frequencies):
+            frequency = counts.get(term, 0)
+            if frequency:
+                norm = k1 * (1 - b + b * len(tokenized[i]) / average_length)
+                scores[i] += idf * frequency * (k1 + 1) / (frequency + norm)
+    return scores
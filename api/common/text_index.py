@@ -0,0 +1,99 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+_TERM = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "the and for are was were is has have had that this with from into over than then its it's not but "
+    "about been which who whom what when where their there they them his her our your also more most".split()
+)
+
+
+def search_terms(text: str, max_terms: int = 16) -> list[str]:
+    """Distinctive words of a text: casefolded, stop words and short words removed (numbers are kept)"""
+    terms = []
+    for term in _TERM.findall(text.casefold()):
+        if (len(term) > 2 or term.isdigit()) and term not in _STOPWORDS and term not in terms:
+            terms.append(term)
+    return terms[:max_terms]
+
+
+class TextIndex:
+    """Persistent full-text index (SQLite FTS5, BM25 ranking) of text snippets with their source, score and fetch time.
+
+    Methods are blocking, call them through `asyncio.to_thread`.
+    """
+
+    def __init__(self, path: str, max_entries: int = 200_000):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS snippets (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                snippet TEXT NOT NULL,
+                score REAL NOT NULL,
+                fetched_at REAL NOT NULL,
+                UNIQUE (source, snippet)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS snippets_fts USING fts5(snippet, content='snippets', content_rowid='id');
+            CREATE TRIGGER IF NOT EXISTS snippets_insert AFTER INSERT ON snippets BEGIN
+                INSERT INTO snippets_fts (rowid, snippet) VALUES (new.id, new.snippet);
+            END;
+            CREATE TRIGGER IF NOT EXISTS snippets_delete AFTER DELETE ON snippets BEGIN
+                INSERT INTO snippets_fts (snippets_fts, rowid, snippet) VALUES ('delete', old.id, old.snippet);
+            END;
+            CREATE INDEX IF NOT EXISTS snippets_fetched_at ON snippets (fetched_at);
+        """)
+        self._db.commit()
+
+    def add(self, entries: list[tuple[str, str, float]]):
+        """Index (source, snippet, score) entries fetched now. A known entry only gets its score and fetch time refreshed"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO snippets (source, snippet, score, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (source, snippet) DO UPDATE SET score = excluded.score, fetched_at = excluded.fetched_at",
+                [(source, snippet, score, now) for source, snippet, score in entries]
+            )
+            excess = self._db.execute("SELECT COUNT(*) FROM snippets").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._db.execute(
+                    "DELETE FROM snippets WHERE id IN (SELECT id FROM snippets ORDER BY fetched_at LIMIT ?)", (excess,)
+                )
+            self._db.commit()
+
+    def search(self, text: str, limit: int = 10, max_age: float | None = None) -> list[dict]:
+        """Best BM25 matches of the terms of `text`, with the share of those terms each snippet contains (`coverage`)"""
+        terms = search_terms(text)
+        if not terms:
+            return []
+        query = " OR ".join(f'"{term}"' for term in terms)
+        fetched_after = time.time() - max_age if max_age is not None else 0.0
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT s.source, s.snippet, s.score, s.fetched_at FROM snippets_fts "
+                "JOIN snippets s ON s.id = snippets_fts.rowid "
+                "WHERE snippets_fts MATCH ? AND s.fetched_at >= ? ORDER BY bm25(snippets_fts) LIMIT ?",
+                (query, fetched_after, limit)
+            ).fetchall()
+        results = []
+        for source, snippet, score, fetched_at in rows:
+            snippet_terms = set(_TERM.findall(snippet.casefold()))
+            coverage = sum(1 for term in terms if term in snippet_terms) / len(terms)
+            results.append({"source": source, "snippet": snippet, "score": score, "fetched_at": fetched_at, "coverage": coverage})
+        return results
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM snippets").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
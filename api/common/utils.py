@@ -1,10 +0,0 @@
-from pydantic import BaseModel, Field
-
-def to_serializable(obj):
-    if isinstance(obj, BaseModel):
-        return obj.dict()
-    if isinstance(obj, list):
-        return [to_serializable(item) for item in obj]
-    if isinstance(obj, dict):
-        return {k: to_serializable(v) for k, v in obj.items()}
-    return obj  # int, str, bool, etc.
\ No newline at end of file
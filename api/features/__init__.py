@@ -1,3 +1,3 @@
-from .verifai import verifai_router
+from .verifai import verifai_router, get_batch_workers, get_diagrams, checkpointing, preload, release_clients, warm_up
 
-__all__ = ["verifai_router"]
\ No newline at end of file
+__all__ = ["verifai_router", "get_batch_workers", "get_diagrams", "checkpointing", "preload", "release_clients", "warm_up"]
@@ -1,3 +1,7 @@
 from .router import router as verifai_router
+from .batch import get_batch_workers
+from .diagram import get_diagrams
+from .runs import checkpointing
+from .warmup import preload, release_clients, warm_up
 
-__all__ = ["verifai_router"]
\ No newline at end of file
+__all__ = ["verifai_router", "get_batch_workers", "get_diagrams", "checkpointing", "preload", "release_clients", "warm_up"]
\ No newline at end of file
@@ -1,6 +1,21 @@
 from .extract_claims import extract_claims
+from .cluster_claims import cluster_claims
+from .select_claims import select_claims
 from .research_evidence import research_evidence
+from .process_evidence import process_evidence
 from .verify_evidence import verify_evidence
-from .generate_report import generate_report
+from .verify_claims import queue_verification, verify_claims
+from .generate_report import write_section, generate_report
 
-__all__ = ["extract_claims", "research_evidence", "verify_evidence", "generate_report"]
\ No newline at end of file
+__all__ = [
+    "extract_claims",
+    "cluster_claims",
+    "select_claims",
+    "research_evidence",
+    "process_evidence",
+    "verify_evidence",
+    "queue_verification",
+    "verify_claims",
+    "write_section",
+    "generate_report"
+]
@@ -0,0 +1,19 @@
+from langgraph.config import get_stream_writer
+from langgraph.runtime import Runtime
+
+from api.common.text import cluster_near_duplicates
+from ..models import VerifaiState, VerifaiConfig
+from ..instrumentation import instrumented
+
+
+@instrumented
+async def cluster_claims(state: VerifaiState, runtime: Runtime[VerifaiConfig]):
+    """Group near-identical claims so that a single representative per group gets researched"""
+    writer = get_stream_writer()
+    # Claims are sorted by priority, so each group representative is its highest priority member
+    claim_groups = cluster_near_duplicates(
+        [claim.text for claim in state["claims"]],
+        runtime.context.claim_similarity_threshold
+    )
+    writer({"event": "cluster_claims_end", "payload": {"claim_groups": claim_groups}})
+    return {"claim_groups": claim_groups}
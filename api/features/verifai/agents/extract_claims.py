@@ -1,12 +1,18 @@
-from pydantic import SecretStr
+import asyncio
+from typing import Callable
 
-from langchain.chat_models import init_chat_model
 from langgraph.config import get_stream_writer
 from langgraph.runtime import Runtime
 from langchain_core.prompts import PromptTemplate
 
+from api.common.tasks import spawn
+from api.common.text import normalize_text, split_chunks
 from api.settings import get_settings
-from ..models import VerifaiState, VerifaiConfig, ClaimsList
+from ..cache import get_cache
+from ..llm import get_streaming_structured_model
+from ..models import VerifaiState, VerifaiConfig, ClaimsList, Claim
+from ..instrumentation import instrumented
+from .research_evidence import first_round_queries
 
 prompt =  PromptTemplate.from_template("""You are an expert claim extraction agent for fact-checking.
 Your task is to identify specific factual claims that can be verified from the given text.
@@ -26,21 +32,99 @@ Extract factual claims from this text and assign each a priority (1-10, higher i
 
 {input_text}""")
 
+async def _extract(text: str, config: VerifaiConfig, on_claim: Callable[[Claim], None]) -> list[Claim]:
+    """Claims of a text, each one passed to `on_claim` as soon as the model is done with it"""
+    cache = get_cache()
+    model_name = config.model_for("extract_claims")
+    cache_key = (normalize_text(text), model_name, config.temperature)
+    cached = await cache.get("extract_claims", *cache_key)
+    if cached is not None:
+        claims = ClaimsList.model_validate(cached).claims
+        for claim in claims:
+            on_claim(claim)
+        return claims
+
+    streaming_llm = get_streaming_structured_model(model_name, config.temperature, ClaimsList)
+    raw = None
+    done = 0
+    async for raw in prompt.pipe(streaming_llm).astream({"input_text": text}):
+        items = (raw or {}).get("claims") or []
+        # A claim is complete once the model has started the next one
+        for item in items[done:len(items) - 1]:
+            on_claim(Claim.model_validate(item))
+        done = max(done, len(items) - 1)
+    result = ClaimsList.model_validate(raw or {})
+    for claim in result.claims[done:]:
+        on_claim(claim)
+    await cache.set("extract_claims", result.model_dump(mode="json"), *cache_key)
+    return result.claims
+
+
+@instrumented
 async def extract_claims(state: VerifaiState, runtime: Runtime[VerifaiConfig]):
-    """Detection and extraction of check-worthy claims"""
+    """Detection and extraction of check-worthy claims, streamed one by one.
+
+    The search queries of each claim are generated as soon as it is extracted, its research starts with them.
+    """
     writer = get_stream_writer()
     writer({"event": "extract_claims_start"})
-    llm = init_chat_model(
-        api_key=SecretStr(get_settings().OPENAI_API_KEY),
-        model=runtime.context.model_name,
-        temperature=runtime.context.temperature
-    )
-    structured_llm = llm.with_structured_output(ClaimsList)
+    config = runtime.context
+    input_text = state["input_text"]
+    max_claims = get_settings().MAX_CLAIMS
+    found: set[str] = set()
+    prefetched: dict[str, asyncio.Task] = {}
+    chunk_tasks: list[asyncio.Task] = []
+
+    def on_claim(claim: Claim):
+        if normalize_text(claim.text).casefold() in found:
+            return  # Extracted from an overlapping chunk already
+        if len(found) == max_claims:
+            return  # Hard limit reached, the claims extracted afterwards are dropped
+        found.add(normalize_text(claim.text).casefold())
+        if len(found) == max_claims:
+            writer({"event": "extract_claims_capped", "payload": {"max_claims": max_claims}})
+        writer({"event": "extract_claims_item", "payload": claim})
+        # Claims past max_claims may well be dropped, their queries wait for their research round
+        if config.max_claims is None or len(prefetched) < config.max_claims:
+            task = spawn(first_round_queries(claim, config))  # Cancelled with the run
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())  # A failure is retried by the research round
+            prefetched[normalize_text(claim.text)] = task
+
+    try:
+        if len(input_text) <= config.extraction_chunk_chars:
+            claims = await _extract(input_text, config, on_claim)
+            claims = [claim for claim in claims if normalize_text(claim.text).casefold() in found]
+        else:
+            # Long inputs: chunks are extracted concurrently and their claims streamed as soon as each chunk is done
+            chunks = split_chunks(input_text, config.extraction_chunk_chars, config.extraction_chunk_overlap)
 
-    raw = await prompt.pipe(structured_llm).ainvoke({"input_text": state["input_text"]})
-    result = ClaimsList.model_validate(raw)
-    claims = sorted(result.claims, key=lambda x: x.priority, reverse=True)
-    writer({"event": "extract_claims_end", "payload": claims})
-    return {"claims": claims}
+            async def extract_chunk(chunk_index: int, chunk: str):
+                return chunk_index, await _extract(chunk, config, on_claim)
 
+            claims = []
+            seen: set[str] = set()
+            # Tasks of their own, cancelled with the node: as_completed would leave them running
+            chunk_tasks = [asyncio.create_task(extract_chunk(i, chunk)) for i, chunk in enumerate(chunks)]
+            for next_chunk in asyncio.as_completed(chunk_tasks):
+                chunk_index, chunk_claims = await next_chunk
+                # Chunks overlap, the same claim may be extracted twice
+                new_claims = [
+                    claim for claim in chunk_claims
+                    if normalize_text(claim.text).casefold() not in seen and normalize_text(claim.text).casefold() in found
+                ]
+                seen.update(normalize_text(claim.text).casefold() for claim in new_claims)
+                claims.extend(new_claims)
+                writer({"event": "extract_claims_chunk", "payload": {"chunk_index": chunk_index, "chunks": len(chunks), "claims": new_claims}})
 
+        claims = sorted(claims, key=lambda x: x.priority, reverse=True)
+        writer({"event": "extract_claims_end", "payload": claims})
+    except BaseException:
+        for task in [*chunk_tasks, *prefetched.values()]:
+            task.cancel()
+        raise
+    # Queries still being generated are not waited for, the research rounds join them
+    claim_queries = {
+        key: task.result() for key, task in prefetched.items()
+        if task.done() and not task.cancelled() and task.exception() is None
+    }
+    return {"claims": claims, "claim_queries": claim_queries}
@@ -1,12 +1,14 @@
-from pydantic import SecretStr
+import asyncio
+from collections import Counter
 
-from langchain.chat_models import init_chat_model
 from langgraph.runtime import Runtime
 from langchain_core.prompts import PromptTemplate
 from langgraph.config import get_stream_writer
+from langgraph.constants import TAG_NOSTREAM
 
-from api.settings import get_settings
-from ..models import VerifaiState, VerifaiConfig
+from ..llm import get_chat_model
+from ..models import FactCheckState, VerifaiState, VerifaiConfig, Verdict
+from ..instrumentation import instrumented
 
 prompt = PromptTemplate.from_template("""You are an expert at communicating fact-check results clearly.
 Create a comprehensive, well-structured report that presents the fact-check findings.
@@ -25,25 +27,119 @@ Fact-Check Results:{verdicts_text}
 
 Generate a comprehensive fact-check report: """)
 
+section_prompt = PromptTemplate.from_template("""You are an expert at communicating fact-check results clearly.
+Explain this fact-check verdict to a general reader in one short paragraph. Say what the evidence shows
+and why it leads to the verdict. Cite evidence using markdown links. Do not repeat the claim or add a title.
+
+Claim: {claim}
+Status: {status}
+Confidence: {confidence}
+Justification: {justification}
+Evidence:
+{evidence_text}
+
+Paragraph: """)
+
+summary_prompt = PromptTemplate.from_template("""You are an expert at communicating fact-check results clearly.
+Write a short overall summary (3 to 5 sentences) of these fact-check results for a general reader.
+The verdict of each claim is detailed in its own section, do not list them again.
+
+Results:
+{results_text}
+
+Summary: """)
+
+
+def format_verdict(number: int, verdict: Verdict) -> str:
+    lines = [
+        f"\n\nClaim {number}: {verdict.claim}",
+        f"Status: {verdict.status.upper()}",
+        f"Confidence: {verdict.confidence:.0%}",
+        f"Justification: {verdict.justification}",
+    ]
+    if verdict.evidence_used:
+        lines.append("Key Evidence:")
+        lines.extend(f"  - {ev.source}" for ev in verdict.evidence_used[:2])
+    return "\n".join(lines) + "\n"
+
+
+def render_section(number: int, verdict: Verdict, body: str) -> str:
+    """Markdown section of a claim: fixed header and sources around the explanation `body`"""
+    sources = "\n".join(f"- <{ev.source}>" for ev in verdict.evidence_used)
+    section = f"### Claim {number}: {verdict.claim}\n\n**{verdict.status}** ({verdict.confidence:.0%} confidence)\n\n{body}"
+    return f"{section}\n\nSources:\n{sources}" if sources else section
+
+
+def render_summary(verdicts: list[Verdict], deferred: int) -> str:
+    counts = Counter(verdict.status for verdict in verdicts)
+    summary = (
+        f"Claims checked: {len(verdicts)} ({counts['SUPPORTS']} supported, {counts['REFUTES']} refuted, "
+        f"{counts['NOT ENOUGH INFO']} without enough information)."
+    )
+    return f"{summary} Claims not checked in time: {deferred}." if deferred else summary
+
+
+async def write_section_body(verdict: Verdict, config: VerifaiConfig) -> str:
+    evidence_text = "\n".join(f"- {ev.source}: {ev.snippet}" for ev in verdict.evidence_used[:2]) or "None"
+    llm = get_chat_model(config.model_for("generate_report"), config.temperature)
+    # Sections are sent whole as report_section frames, their tokens are kept out of the report token stream
+    response = await section_prompt.pipe(llm).with_config(tags=[TAG_NOSTREAM]).ainvoke({
+        "claim": verdict.claim,
+        "status": verdict.status,
+        "confidence": f"{verdict.confidence:.0%}",
+        "justification": verdict.justification,
+        "evidence_text": evidence_text
+    })
+    return response.content
+
+
+@instrumented
+async def write_section(state: FactCheckState, runtime: Runtime[VerifaiConfig]):
+    """Report section of a verified claim, written while the other claims are still being researched"""
+    writer = get_stream_writer()
+    body = await write_section_body(state["verdicts"][0], runtime.context)
+    indexes = [state["index"]] + [index for index, _ in state.get("duplicates", [])]
+    for index, verdict in zip(indexes, state["verdicts"]):
+        writer({"event": "report_section", "payload": {"claim_index": index, "content": render_section(index + 1, verdict, body)}})
+    return {"report_sections": [(verdict.claim, body) for verdict in state["verdicts"]]}
+
+
+@instrumented
 async def generate_report(state: VerifaiState, runtime: Runtime[VerifaiConfig]):
     writer = get_stream_writer()
     writer({"event":"generate_report_start"})
-    verdicts_text = ""
-    for i, verdict in enumerate(state["verdicts"], 1):
-                verdicts_text += f"\n\nClaim {i}: {verdict.claim}\n"
-                verdicts_text += f"Status: {verdict.status.upper()}\n"
-                verdicts_text += f"Confidence: {verdict.confidence:.0%}\n"
-                verdicts_text += f"Justification: {verdict.justification}\n"
-                if verdict.evidence_used:
-                    verdicts_text += "Key Evidence:\n"
-                    for ev in verdict.evidence_used[:2]:
-                        verdicts_text += f"  - {ev.source}\n"
-
-    llm = init_chat_model(
-        api_key=SecretStr(get_settings().OPENAI_API_KEY),
-        model=runtime.context.model_name,
-        temperature=runtime.context.temperature
-    )
-    response = await prompt.pipe(llm).ainvoke({"input_text": state["input_text"], "verdicts_text": verdicts_text})
-    writer({"event":"generate_report_end","payload": response})
-    return {"final_report": response.content}
\ No newline at end of file
+    config = runtime.context
+    # Verdicts arrive in completion order, the report follows the claims order
+    numbers = {}
+    for index, claim in enumerate(state["claims"]):
+        numbers.setdefault(claim.text, index + 1)
+    verdicts = sorted(state["verdicts"], key=lambda verdict: numbers.get(verdict.claim, len(numbers) + 1))
+
+    if config.report_mode == "full":
+        verdicts_text = "".join(format_verdict(i, verdict) for i, verdict in enumerate(verdicts, 1))
+        llm = get_chat_model(config.model_for("generate_report"), config.temperature)
+        response = await prompt.pipe(llm).ainvoke({"input_text": state["input_text"], "verdicts_text": verdicts_text})
+        writer({"event":"generate_report_end"})  # The report itself is streamed as tokens
+        return {"final_report": response.content}
+
+    bodies = dict(state.get("report_sections", []))
+    if config.report_mode == "sections":
+        # Batched verify modes have no section yet, they are written side by side
+        missing = [verdict for verdict in verdicts if verdict.claim not in bodies]
+        for verdict, body in zip(missing, await asyncio.gather(*[write_section_body(verdict, config) for verdict in missing])):
+            bodies[verdict.claim] = body
+            number = numbers.get(verdict.claim, 0)
+            writer({"event": "report_section", "payload": {"claim_index": number - 1, "content": render_section(number, verdict, body)}})
+        results_text = "\n".join(f"- {verdict.claim}: {verdict.status} ({verdict.confidence:.0%})" for verdict in verdicts)
+        llm = get_chat_model(config.model_for("generate_report"), config.temperature)
+        summary = (await summary_prompt.pipe(llm).ainvoke({"results_text": results_text or "No claims checked"})).content
+    else:
+        summary = render_summary(verdicts, len(state.get("deferred_claims", [])))
+        for verdict in verdicts:
+            number = numbers.get(verdict.claim, 0)
+            writer({"event": "report_section", "payload": {"claim_index": number - 1, "content": render_section(number, verdict, verdict.justification)}})
+        writer({"event": "report_summary", "payload": {"content": summary}})
+
+    sections = [render_section(numbers.get(verdict.claim, 0), verdict, bodies.get(verdict.claim, verdict.justification)) for verdict in verdicts]
+    writer({"event":"generate_report_end"})
+    return {"final_report": "\n\n".join(["# Fact-check report", summary, *sections])}
@@ -0,0 +1,42 @@
+from urllib.parse import urlsplit, urlunsplit
+
+from langgraph.config import get_stream_writer
+from langgraph.runtime import Runtime
+
+from api.common.text import jaccard, shingles
+from ..evidence_store import get_evidence_store
+from ..models import EvidenceRef, FactCheckState, VerifaiConfig
+from ..instrumentation import instrumented
+
+NEAR_DUPLICATE_THRESHOLD = 0.8  # Snippets sharing this share of their word trigrams are considered the same evidence
+
+
+def _canonical_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    return urlunsplit((parts.scheme.lower(), host, parts.path.rstrip("/"), parts.query, ""))
+
+
+@instrumented
+async def process_evidence(state: FactCheckState, runtime: Runtime[VerifaiConfig]):
+    """Deduplicate the evidence gathered across queries (same URL or near-identical snippet) and keep the most relevant pieces"""
+    index = state["index"]
+    writer = get_stream_writer()
+    store = get_evidence_store()
+    evidence_refs: list[EvidenceRef] = []
+    seen_sources: set[str] = set()
+    seen_snippets: list[set[str]] = []
+    for evidence_id, score in sorted(state["evidence_refs"], key=lambda ref: ref[1], reverse=True):
+        record = store.get(evidence_id)
+        source = _canonical_url(record.source)
+        snippet = shingles(record.snippet)
+        if source in seen_sources or any(jaccard(snippet, other) >= NEAR_DUPLICATE_THRESHOLD for other in seen_snippets):
+            continue
+        seen_sources.add(source)
+        seen_snippets.append(snippet)
+        evidence_refs.append((evidence_id, score))
+        if len(evidence_refs) == runtime.context.max_evidence_per_claim:
+            break
+
+    writer({"event":f"process_evidence_end_{index}", "payload":{"claim_index": index, "evidences": store.evidence(evidence_refs)}})
+    return {"evidence_refs": evidence_refs}
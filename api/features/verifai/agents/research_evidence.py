@@ -1,69 +1,145 @@
+import asyncio
 
-from langchain.chat_models import init_chat_model
 from langgraph.config import get_stream_writer
-from pydantic import SecretStr
 from langgraph.runtime import Runtime
 from langchain_core.prompts import PromptTemplate
-from tavily import TavilyClient
-from langgraph.config import get_stream_writer
 
-from api.settings import get_settings
+from api.common.limiter import current_priority
+from api.common.text import normalize_text
+from ..budget import past_deadline
+from ..cache import get_cache, get_single_flight
+from ..evidence_index import find_local_evidence, index_evidence
+from ..evidence_store import get_evidence_store
+from ..llm import get_structured_model
 from ..models import (
+    Claim,
     Evidence, 
     SearchQueries, 
     FactCheckState, 
     VerifaiConfig
 )
+from ..search import search
+from ..instrumentation import instrumented
 
 prompt = PromptTemplate.from_template("""You are an expert at formulating search queries for fact-checking.
-Given a claim, create 2 effective search queries that would help verify or refute the claim.
+Given a claim, create {max_queries} effective search queries that would help verify or refute the claim.
 Claim: {claim_text}
 Generate search queries that will find relevant evidence.""")
 
+def _out_of_time(state: FactCheckState) -> bool:
+    return past_deadline(state.get("deadline"))
+
+
+def _search_plan(state: FactCheckState, config: VerifaiConfig) -> tuple[int, str, int]:
+    """(queries, search depth, results per query) of the research round. Adaptive research starts with a cheap round"""
+    if config.adaptive_confidence is not None and config.verify_mode == "per_claim" and not state.get("escalated"):
+        return config.initial_queries_per_claim, "basic", config.initial_results_per_query
+    return config.max_queries_per_claim, config.search_depth, config.max_search_results_per_query
+
+
+async def generate_queries(claim_text: str, max_queries: int, config: VerifaiConfig) -> list[str]:
+    """Search queries of a claim, cached and shared with the identical generation in flight"""
+    cache = get_cache()
+    model_name = config.model_for("research_evidence")
+    cache_key = (normalize_text(claim_text), max_queries, model_name, config.temperature)
+    cached = await cache.get("search_queries", *cache_key)
+    if cached is not None:
+        return SearchQueries.model_validate(cached).queries[:max_queries]
+
+    async def run() -> SearchQueries:
+        structured_llm = get_structured_model(model_name, config.temperature, SearchQueries)
+        raw = await prompt.pipe(structured_llm).ainvoke({"claim_text": claim_text, "max_queries": max_queries})
+        search_queries = SearchQueries.model_validate(raw)
+        await cache.set("search_queries", search_queries.model_dump(mode="json"), *cache_key)
+        return search_queries
+
+    search_queries = await get_single_flight().do("search_queries", run, *cache_key)
+    return search_queries.queries[:max_queries]
+
+
+async def first_round_queries(claim: Claim, config: VerifaiConfig) -> list[str]:
+    """Search queries of the first research round of a claim, generated ahead of it while claims are extracted.
+    A research round starting before they are done joins their generation"""
+    current_priority.set(claim.priority)
+    max_queries, _, _ = _search_plan({}, config)
+    return await generate_queries(claim.text, max_queries, config)
+
+
+def _defer(state: FactCheckState, writer):
+    """Give up on the claim (and its duplicates) once the research time budget is spent"""
+    index = state["index"]
+    writer({"event":f"research_evidence_deferred_{index}", "payload": {"claim_index": index}})
+    claims = [state["claim"]] + [claim for _, claim in state.get("duplicates", [])]
+    return {"evidence_refs": [], "deferred_claims": claims}
+
+
+@instrumented
 async def research_evidence(state: FactCheckState, runtime: Runtime[VerifaiConfig]):
     index = state["index"]
     writer = get_stream_writer()
+    if _out_of_time(state):
+        # An escalated claim keeps its first-round evidence rather than being deferred
+        return {} if state.get("escalated") else _defer(state, writer)
     writer({"event":f"research_evidence_start_{index}", "payload": {"claim_index": index}})
-    evidence_list: list[Evidence] = []
+    current_priority.set(state["claim"].priority)
     claim_text = state["claim"].text
-    llm = init_chat_model(
-        api_key=SecretStr(get_settings().OPENAI_API_KEY),
-        model=runtime.context.model_name,
-        temperature=runtime.context.temperature
-    )
-    structured_llm = llm.with_structured_output(SearchQueries)
+    config = runtime.context
+    store = get_evidence_store()
+    max_queries, search_depth, max_results = _search_plan(state, config)
+    local_evidence = [] if state.get("escalated") else await find_local_evidence(claim_text, config)
+    if local_evidence:
+        writer({"event":f"research_evidence_local_{index}", "payload": {"claim_index": index, "evidences": local_evidence}})
+        writer({"event":f"research_evidence_end_{index}", "payload":{"claim_index": index, "evidences": local_evidence}})
+        return {"evidence_refs": [store.ref(evidence) for evidence in local_evidence]}
 
-    raw = await prompt.pipe(structured_llm).ainvoke({"claim_text": claim_text})
-    search_queries = SearchQueries.model_validate(raw)
-    queries = search_queries.queries
+    # Claims come with the queries of their first round, generated as soon as they were extracted
+    queries = None if state.get("escalated") else state.get("queries")
+    if not queries:
+        queries = await generate_queries(claim_text, max_queries, config)
+    if _out_of_time(state):
+        # An escalated claim keeps its first-round evidence rather than being deferred
+        return {} if state.get("escalated") else _defer(state, writer)
 
     
-    writer({"event":f"research_evidence_queries{index}", "payload": {"claim_index": index, "queries": queries}})
-    
-    for query_index, query in enumerate(queries):  # Limit to 2 queries per claim
-
-        search_params = {
-            "query": query,
-            "max_results": 3,
-            "search_depth": "advanced"
-        }
-        query_evidence: list[Evidence] = [] # For event purpose only
-        # Restrict to specific domain if specified (e.g., Wikipedia)
-        #if search_domain:
-        #    search_params["include_domains"] = [search_domain]
-        tavily_client = TavilyClient(api_key=get_settings().TAVILY_API_KEY)
-        search_results = tavily_client.search(**search_params)
-        
-        for result in search_results.get('results', []):
-            evidence = Evidence(
-                source=result.get('url', ''),
-                snippet=result.get('content', '')[:500],  # Limit snippet length
-                relevance_score=result.get('score', 0.5)
-            )
-            evidence_list.append(evidence)
-            query_evidence.append(evidence)
-        writer({"event":f"research_evidence_results_{index}", "payload":{"claim_index": index, "query_index": query_index ,"evidences": evidence_list}})
-        
+    writer({"event":f"research_evidence_queries_{index}", "payload": {"claim_index": index, "queries": queries}})
+
+    async def run_query(query_index: int, query: str):
+        search_results = await search(
+            query,
+            max_results=max_results,
+            search_depth=search_depth,
+            timeout=config.search_timeout
+        )
+        return query_index, search_results
+
+    # All queries of the claim are sent at once, results are handled as soon as each one completes. Tasks of
+    # their own, cancelled with the node: as_completed would leave them running
+    evidence_by_query: dict[int, list[Evidence]] = {}
+    query_tasks = [asyncio.create_task(run_query(i, query)) for i, query in enumerate(queries)]
+    try:
+        for next_result in asyncio.as_completed(query_tasks):
+            query_index, search_results = await next_result
+            query_evidence: list[Evidence] = []
+            for result in search_results.get('results', []):
+                evidence = Evidence(
+                    source=result.get('url', ''),
+                    snippet=result.get('content', '')[:config.snippet_max_length],  # Limit snippet length
+                    relevance_score=result.get('score', 0.5)
+                )
+                query_evidence.append(evidence)
+            evidence_by_query[query_index] = query_evidence
+            # Only the evidence of this query, the stream consumer accumulates them
+            writer({"event":f"research_evidence_results_{index}", "payload":{"claim_index": index, "query_index": query_index ,"evidences": query_evidence}})
+    except BaseException:
+        for task in query_tasks:
+            task.cancel()
+        raise
+
+    # Keep evidence ordered by query regardless of completion order
+    evidence_list = [ev for query_index in sorted(evidence_by_query) for ev in evidence_by_query[query_index]]
+    await index_evidence(evidence_list)
     writer({"event":f"research_evidence_end_{index}", "payload":{"claim_index": index, "evidences": evidence_list}})
-    
-    return {"evidence_list": evidence_list}
\ No newline at end of file
+    # Only ids are kept in the branch state, the run store holds the evidence once
+    evidence_refs = [store.ref(evidence) for evidence in evidence_list]
+    # An escalated round adds to the evidence of the first one
+    return {"evidence_refs": state.get("evidence_refs", []) + evidence_refs if state.get("escalated") else evidence_refs}
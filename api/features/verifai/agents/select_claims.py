@@ -0,0 +1,24 @@
+import time
+
+from langgraph.config import get_stream_writer
+from langgraph.runtime import Runtime
+
+from ..models import VerifaiState, VerifaiConfig
+from ..instrumentation import instrumented
+
+
+@instrumented
+async def select_claims(state: VerifaiState, runtime: Runtime[VerifaiConfig]):
+    """Keep the highest priority claims within the mode budget, the others are deferred"""
+    writer = get_stream_writer()
+    config = runtime.context
+    claim_groups = state["claim_groups"]  # Ordered by priority
+    selected = claim_groups[:config.max_claims] if config.max_claims else claim_groups
+    deferred_indexes = [index for group in claim_groups[len(selected):] for index in group]
+    if deferred_indexes:
+        writer({"event": "claims_deferred", "payload": {"claim_indexes": deferred_indexes}})
+    return {
+        "claim_groups": selected,
+        "deferred_claims": [state["claims"][index] for index in deferred_indexes],
+        "research_deadline": time.time() + config.time_budget_seconds if config.time_budget_seconds else None
+    }
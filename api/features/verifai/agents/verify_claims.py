@@ -0,0 +1,118 @@
+from langgraph.config import get_stream_writer
+from langgraph.runtime import Runtime
+from langchain_core.prompts import PromptTemplate
+
+from ..cache import get_cache
+from ..evidence_store import get_evidence_store
+from ..llm import get_structured_model
+from ..models import (
+    FactCheckState,
+    VerifaiState,
+    VerifaiConfig,
+    ResearchedClaim,
+    VerdictOutput,
+    ClaimVerdictsOutput,
+    Verdict
+)
+from .verify_evidence import (
+    VERIFICATION_INSTRUCTIONS,
+    prompt,
+    format_evidence,
+    verdict_cache_key,
+    cascade,
+    emit_verdicts,
+    to_verdict
+)
+from ..instrumentation import instrumented
+
+packed_prompt = PromptTemplate.from_template(VERIFICATION_INSTRUCTIONS + """
+For every claim id, provide a verdict with:
+1. Claim id: the id of the claim
+2. Status: "SUPPORTS", "REFUTES", or "NOT ENOUGH INFO"
+3. Confidence: 0 to 1 (lower confidence for partial/indirect evidence)
+4. Justification: Explain whether evidence DIRECTLY addresses ALL claim specifics
+5. Used evidence: List provided evidence ids used for the verdict decision
+
+Now analyze each of the following claims independently. Evidence ids refer to the evidence listed under the same claim.
+
+{claims_text}
+""")
+
+
+@instrumented
+def queue_verification(state: FactCheckState):
+    """Hand the researched claim over to the batched verification step of the main graph"""
+    return {"researched_claims": [ResearchedClaim(
+        index=state["index"],
+        claim=state["claim"],
+        evidence_list=get_evidence_store().evidence(state["evidence_refs"]),
+        duplicates=state.get("duplicates", [])
+    )]}
+
+
+@instrumented
+async def verify_claims(state: VerifaiState, runtime: Runtime[VerifaiConfig]):
+    """Batched verification of every researched claim once all research teams are done"""
+    writer = get_stream_writer()
+    config = runtime.context
+    cache = get_cache()
+    researched = sorted(state.get("researched_claims", []), key=lambda r: r.index)
+    verdicts: list[Verdict] = []
+    pending: list[tuple[ResearchedClaim, str]] = []
+    for item in researched:
+        writer({"event":f"verify_evidence_start_{item.index}"})
+        evidence_text = format_evidence(item.claim.text, item.evidence_list, config)
+        cached = await cache.get("verdict", *verdict_cache_key(item.claim.text, evidence_text, config.model_for("verify_claims"), config))
+        if cached is not None:
+            verdicts.extend(await _emit_verdicts(writer, item, evidence_text, VerdictOutput.model_validate(cached), config))
+        else:
+            pending.append((item, evidence_text))
+
+    if pending and config.verify_mode == "packed":
+        pending = await _verify_packed(pending, config, writer, verdicts)
+    if pending:
+        await _verify_batched(pending, config, writer, verdicts)
+    return {"verdicts": verdicts}
+
+
+async def _verify_batched(pending: list[tuple[ResearchedClaim, str]], config: VerifaiConfig, writer, verdicts: list[Verdict]):
+    """One verdict call per claim, at most `verify_concurrency` in flight. Verdicts are streamed as they complete"""
+    model_name = config.model_for("verify_claims")
+    structured_llm = get_structured_model(model_name, config.temperature, VerdictOutput)
+    inputs = [{"claim_text": item.claim.text, "evidence_text": evidence_text} for item, evidence_text in pending]
+    async for position, raw in prompt.pipe(structured_llm).abatch_as_completed(
+        inputs,
+        config={"max_concurrency": config.verify_concurrency}
+    ):
+        item, evidence_text = pending[position]
+        verdict_output = VerdictOutput.model_validate(raw)
+        await get_cache().set("verdict", verdict_output.model_dump(mode="json"), *verdict_cache_key(item.claim.text, evidence_text, model_name, config))
+        verdicts.extend(await _emit_verdicts(writer, item, evidence_text, verdict_output, config))
+
+
+async def _verify_packed(pending: list[tuple[ResearchedClaim, str]], config: VerifaiConfig, writer, verdicts: list[Verdict]):
+    """All claims in a single structured call. Returns the claims the model did not answer for"""
+    claims_text = "\n\n".join([
+        f"Claim id: {claim_id}\nClaim: {item.claim.text}\nEvidence:\n{evidence_text}"
+        for claim_id, (item, evidence_text) in enumerate(pending)
+    ])
+    model_name = config.model_for("verify_claims")
+    structured_llm = get_structured_model(model_name, config.temperature, ClaimVerdictsOutput)
+    raw = await packed_prompt.pipe(structured_llm).ainvoke({"claims_text": claims_text})
+    answers = {output.claim_id: output for output in ClaimVerdictsOutput.model_validate(raw).verdicts}
+
+    unanswered: list[tuple[ResearchedClaim, str]] = []
+    for claim_id, (item, evidence_text) in enumerate(pending):
+        if claim_id not in answers:
+            unanswered.append((item, evidence_text))
+            continue
+        verdict_output = VerdictOutput.model_validate(answers[claim_id].model_dump(exclude={"claim_id"}))
+        await get_cache().set("verdict", verdict_output.model_dump(mode="json"), *verdict_cache_key(item.claim.text, evidence_text, model_name, config))
+        verdicts.extend(await _emit_verdicts(writer, item, evidence_text, verdict_output, config))
+    return unanswered
+
+
+async def _emit_verdicts(writer, item: ResearchedClaim, evidence_text: str, verdict_output: VerdictOutput, config: VerifaiConfig) -> list[Verdict]:
+    verdict_output = await cascade(item.claim.text, evidence_text, verdict_output, config.model_for("verify_claims"), config)
+    verdict = to_verdict(item.claim.text, verdict_output, item.evidence_list)
+    return emit_verdicts(writer, item.index, verdict, item.duplicates)
@@ -1,14 +1,21 @@
-from pydantic import SecretStr
+from typing import Callable, get_args
 
 from langgraph.config import get_stream_writer
-from langchain.chat_models import init_chat_model
 from langgraph.runtime import Runtime
 from langchain_core.prompts import PromptTemplate
 
-from api.settings import get_settings
-from ..models import (FactCheckState, VerifaiConfig, VerdictOutput , Verdict)
+from api.common.limiter import current_priority
+from api.common.text import bm25_scores, normalize_text, split_sentences
+from api.common.text_index import search_terms
+from ..budget import past_deadline
+from ..cache import get_cache, get_single_flight
+from ..evidence_store import get_evidence_store
+from ..llm import get_streaming_structured_model, get_structured_model
+from ..models import (FactCheckState, VerifaiConfig, VerdictOutput , Verdict, Evidence, Claim)
+from ..instrumentation import instrumented, record_verdict
 
-prompt = PromptTemplate.from_template("""You are an expert fact-checker responsible for verifying claims.
+# Static instructions shared by the single and the packed multi-claim verification prompts
+VERIFICATION_INSTRUCTIONS = """You are an expert fact-checker responsible for verifying claims.
 
 CRITICAL INSTRUCTIONS FOR ACCURATE VERIFICATION:
 
@@ -35,6 +42,15 @@ COMMON PITFALLS TO AVOID:
   → This is NOT ENOUGH INFO
 
 BE CONSERVATIVE: When in doubt, choose NOT ENOUGH INFO over making assumptions.
+"""
+
+# Static text first, claim and evidence last: providers cache the prompt prefix shared by every verdict call
+prompt = PromptTemplate.from_template(VERIFICATION_INSTRUCTIONS + """
+Provide your verdict with:
+1. Status: "SUPPORTS", "REFUTES", or "NOT ENOUGH INFO"
+2. Confidence: 0 to 1 (lower confidence for partial/indirect evidence)
+3. Justification: Explain whether evidence DIRECTLY addresses ALL claim specifics
+4. Used evidence: List provided evidence ids used for the verdict decision
 
 Now analyze this claim:
 
@@ -42,35 +58,144 @@ Claim: {claim_text}
 
 Evidence:
 {evidence_text}
-
-Provide your verdict with:
-1. Status: "SUPPORTS", "REFUTES", or "NOT ENOUGH INFO" 
-2. Confidence: 0 to 1 (lower confidence for partial/indirect evidence)
-3. Justification: Explain whether evidence DIRECTLY addresses ALL claim specifics
-4. Used evidence: List provided evience ids used for the veerdict decision                                        
 """)
 
-def verify_evidence(state: FactCheckState, runtime: Runtime[VerifaiConfig]):
-    writer = get_stream_writer()
-    writer({"event":f"verify_evidence_start_{state['index']}"})
-    evidence_list = state["evidence_list"]
-    claim_text = state["claim"].text
+CHARS_PER_TOKEN = 4  # Rough estimate, good enough for budgets
+
+
+def compress_snippets(claim_text: str, snippets: list[str], token_budget: int) -> list[str]:
+    """Sentences of each snippet closest to the claim (BM25), within `token_budget` tokens overall.
+
+    Every snippet keeps at least its best sentence so that each piece of evidence can still be cited.
+    Kept sentences stay in their original order, gaps are marked with an ellipsis.
+    """
+    sentences = [split_sentences(snippet) or [snippet] for snippet in snippets]
+    spans = [(i, j) for i, parts in enumerate(sentences) for j in range(len(parts))]
+    scores = bm25_scores(search_terms(claim_text, max_terms=32), [sentences[i][j] for i, j in spans])
+    ranked = sorted(range(len(spans)), key=lambda k: scores[k], reverse=True)
+    budget = token_budget * CHARS_PER_TOKEN
+    share = budget // max(len(snippets), 1)
+    kept: list[dict[int, str]] = [{} for _ in snippets]
+    seen: set[str] = set()
+    # The best sentence of each snippet first, cut to an even share of the budget, then the best others that fit
+    for k in ranked:
+        i, j = spans[k]
+        if not kept[i]:
+            sentence = sentences[i][j]
+            kept[i][j] = sentence if len(sentence) <= share else sentence[:share].rsplit(" ", 1)[0] + " …"
+            seen.add(sentence)
+            budget -= len(kept[i][j])
+    for k in ranked:
+        i, j = spans[k]
+        sentence = sentences[i][j]
+        if scores[k] > 0 and j not in kept[i] and sentence not in seen and len(sentence) <= budget:
+            kept[i][j] = sentence
+            seen.add(sentence)
+            budget -= len(sentence)
+
+    compressed = []
+    for parts in kept:
+        text, previous = [], None
+        for j in sorted(parts):
+            if previous is not None and j != previous + 1:
+                text.append("…")
+            text.append(parts[j])
+            previous = j
+        compressed.append(" ".join(text))
+    return compressed
+
+
+STATUSES = get_args(VerdictOutput.model_fields["status"].annotation)
+
+
+def format_evidence(claim_text: str, evidence_list: list[Evidence], config: VerifaiConfig) -> str:
+    """Evidence block of a verification prompt. Ids are the positions in the evidence list.
+
+    Snippets are cut down to their sentences relevant to the claim, the evidence itself is unchanged for the citations.
+    """
+    evidence_list = evidence_list[:config.evidence_for_verdict]  # Evidence is ranked, keep the top pieces
+    snippets = [ev.snippet for ev in evidence_list]
+    if config.evidence_token_budget is not None:
+        snippets = compress_snippets(claim_text, snippets, config.evidence_token_budget)
     evidence_text = "\n\n".join([
-                f"Id: {index}, Source: {ev.source}\nSnippet: {ev.snippet}"
-                for index, ev in enumerate(evidence_list[:5])  # Limit to top 5 evidence pieces
+                f"Id: {index}, Source: {ev.source}\nSnippet: {snippet}"
+                for index, (ev, snippet) in enumerate(zip(evidence_list, snippets))
             ])
-            
-    if not evidence_text:
-        evidence_text = "No evidence found."
-    llm = init_chat_model(
-        api_key=SecretStr(get_settings().OPENAI_API_KEY),
-        model=runtime.context.model_name,
-        temperature=runtime.context.temperature
+    return evidence_text or "No evidence found."
+
+
+def verdict_cache_key(claim_text: str, evidence_text: str, model_name: str, config: VerifaiConfig) -> tuple:
+    return (normalize_text(claim_text), evidence_text, model_name, config.temperature)
+
+
+async def judge(
+    claim_text: str,
+    evidence_text: str,
+    model_name: str,
+    config: VerifaiConfig,
+    on_status: Callable[[str, float], None] | None = None
+) -> VerdictOutput:
+    """Verdict of one claim by `model_name`, cached and shared with the identical calls in flight.
+
+    With `on_status`, the verdict is streamed and its status and confidence are passed on as soon as they are
+    generated, before the justification.
+    """
+    cache = get_cache()
+    cache_key = verdict_cache_key(claim_text, evidence_text, model_name, config)
+    cached = await cache.get("verdict", *cache_key)
+    if cached is not None:
+        return VerdictOutput.model_validate(cached)
+
+    async def run() -> VerdictOutput:
+        inputs = {"claim_text": claim_text, "evidence_text": evidence_text}
+        if on_status is None:
+            raw = await prompt.pipe(get_structured_model(model_name, config.temperature, VerdictOutput)).ainvoke(inputs)
+        else:
+            raw = await _stream_verdict(get_streaming_structured_model(model_name, config.temperature, VerdictOutput), inputs, on_status)
+        verdict_output = VerdictOutput.model_validate(raw)
+        await cache.set("verdict", verdict_output.model_dump(mode="json"), *cache_key)
+        return verdict_output
+
+    return await get_single_flight().do("verdict", run, *cache_key)
+
+
+async def _stream_verdict(streaming_llm, inputs: dict, on_status: Callable[[str, float], None]) -> dict | None:
+    raw = None
+    sent = False
+    async for raw in prompt.pipe(streaming_llm).astream(inputs):
+        # Status and confidence are complete once the model has moved on to the justification
+        if not sent and raw and "justification" in raw and raw.get("status") in STATUSES and isinstance(raw.get("confidence"), (int, float)):
+            on_status(raw["status"], raw["confidence"])
+            sent = True
+    return raw
+
+
+def _uncertain(verdict_output: VerdictOutput, confidence: float) -> bool:
+    return verdict_output.status == "NOT ENOUGH INFO" or verdict_output.confidence < confidence
+
+
+async def cascade(
+    claim_text: str,
+    evidence_text: str,
+    verdict_output: VerdictOutput,
+    model_name: str,
+    config: VerifaiConfig,
+    on_status: Callable[[str, float], None] | None = None
+) -> VerdictOutput:
+    """Final verdict of a claim: an uncertain verdict of `model_name` is given again by the escalation model"""
+    escalated = (
+        config.escalation_model is not None
+        and config.escalation_model != model_name
+        and _uncertain(verdict_output, config.escalation_confidence)
     )
-    structured_llm = llm.with_structured_output(VerdictOutput )
-    raw = prompt.pipe(structured_llm).invoke({"claim_text": claim_text, "evidence_text": evidence_text})
-    verdict_output = VerdictOutput.model_validate(raw)
-    verdict = Verdict(
+    record_verdict(escalated)
+    if escalated:
+        return await judge(claim_text, evidence_text, config.escalation_model, config, on_status)
+    return verdict_output
+
+
+def to_verdict(claim_text: str, verdict_output: VerdictOutput, evidence_list: list[Evidence]) -> Verdict:
+    return Verdict(
         claim=claim_text,
         status=verdict_output.status,
         confidence=verdict_output.confidence,
@@ -80,5 +205,58 @@ def verify_evidence(state: FactCheckState, runtime: Runtime[VerifaiConfig]):
             if i in verdict_output.evidence_ids_used
         ]
     )
-    writer({"event":f"verify_evidence_end_{state['index']}","payload": verdict})    
-    return {"verdicts": [verdict]}
\ No newline at end of file
+
+
+def emit_verdicts(writer, index: int, verdict: Verdict, duplicates: list[tuple[int, Claim]]) -> list[Verdict]:
+    """Stream the verdict of a researched claim along with its copies for the near-identical claims it stands for"""
+    writer({"event":f"verify_evidence_end_{index}","payload": verdict})
+    verdicts = [verdict]
+    for duplicate_index, duplicate in duplicates:
+        copy = verdict.model_copy(update={"claim": duplicate.text})
+        writer({"event":f"verify_evidence_end_{duplicate_index}","payload": copy})
+        verdicts.append(copy)
+    return verdicts
+
+
+def _should_escalate(state: FactCheckState, verdict_output: VerdictOutput, config: VerifaiConfig) -> bool:
+    """Whether an uncertain first-round verdict is worth a full research round, time budget permitting"""
+    if config.adaptive_confidence is None or state.get("escalated"):
+        return False
+    if past_deadline(state.get("deadline")):
+        return False
+    return _uncertain(verdict_output, config.adaptive_confidence)
+
+
+@instrumented
+async def verify_evidence(state: FactCheckState, runtime: Runtime[VerifaiConfig]):
+    writer = get_stream_writer()
+    writer({"event":f"verify_evidence_start_{state['index']}"})
+    current_priority.set(state["claim"].priority)
+    # Only the top pieces make it to the prompt, the others are left in the store
+    evidence_list = get_evidence_store().evidence(state["evidence_refs"][:runtime.context.evidence_for_verdict])
+    claim_text = state["claim"].text
+    config = runtime.context
+    evidence_text = format_evidence(claim_text, evidence_list, config)
+    model_name = config.model_for("verify_evidence")
+
+    def on_status(status: str, confidence: float):
+        # Preliminary: the verdict may still be escalated, the end event has the final one
+        for claim_index in [state["index"]] + [index for index, _ in state.get("duplicates", [])]:
+            writer({"event": f"verify_evidence_status_{claim_index}", "payload": {
+                "claim_index": claim_index,
+                "status": status,
+                "confidence": confidence
+            }})
+
+    verdict_output = await judge(claim_text, evidence_text, model_name, config, on_status)
+    if _should_escalate(state, verdict_output, config):
+        writer({"event":f"verify_evidence_escalated_{state['index']}", "payload": {
+            "claim_index": state["index"],
+            "status": verdict_output.status,
+            "confidence": verdict_output.confidence
+        }})
+        return {"escalated": True}
+    # More evidence would not come, a stronger model may still read it better
+    verdict_output = await cascade(claim_text, evidence_text, verdict_output, model_name, config, on_status)
+    verdict = to_verdict(claim_text, verdict_output, evidence_list)
+    return {"verdicts": emit_verdicts(writer, state["index"], verdict, state.get("duplicates", []))}
@@ -0,0 +1,138 @@
+"""Background workers fact checking the documents of batch jobs"""
+
+import asyncio
+import logging
+from functools import lru_cache
+
+from pydantic_core import to_jsonable_python
+
+from api.common.cache import ResultCache
+from api.common.jobs import JobStore
+from api.common.limiter import current_request_id
+from api.common.tasks import RunTasks, current_tasks
+from api.common.text import normalize_text
+from api.settings import get_settings
+from .cache import scoped_cache
+from .config import get_config
+from .instrumentation import RequestStats, UsageCallbackHandler, current_stats, record_cache_lookup
+from .models import VerifaiInput
+from .runs import forget, get_graph, resume_input
+
+logger = logging.getLogger(__name__)
+
+IDLE_POLL_SECONDS = 5.0
+LEASE_SECONDS = 60.0  # An item is claimed again this long after its worker stopped renewing it (process gone)
+
+
+class BatchWorkers:
+    """Bounded pool of workers running the graph on the queued items of every batch job.
+
+    All the items of a job share one limiter request id, so a large batch gets a fair share of the
+    providers next to interactive requests instead of starving them. Claims and searches are
+    deduplicated across the job through the result cache (a job-scoped one when caching is disabled).
+    Each item is checkpointed, an item interrupted by a restart continues where it stopped. Items are
+    leased, so the workers of several processes sharing the store never run the same item.
+    """
+
+    def __init__(self, store: JobStore, workers: int):
+        self.store = store
+        self.workers = workers
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._job_caches: dict[str, ResultCache] = {}
+        self._running: set[tuple[str, int]] = set()  # (job id, position) of the items leased by this process
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work(), name=f"verifai-batch-{i}") for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._renew_leases(), name="verifai-batch-leases"))
+
+    async def stop(self):
+        interrupted = list(self._running)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Back to the queue right away rather than once their lease runs out, they continue from their checkpoint
+        await asyncio.to_thread(self.store.release, interrupted)
+
+    async def submit(self, items: list[VerifaiInput]) -> str:
+        job_id = await asyncio.to_thread(self.store.create, [
+            (item.model_dump(mode="json"), f"{item.mode}:{normalize_text(item.input_text)}")
+            for item in items
+        ])
+        self._wakeup.set()
+        return job_id
+
+    async def job(self, job_id: str) -> dict | None:
+        return await asyncio.to_thread(self.store.job, job_id)
+
+    async def items(self, job_id: str, offset: int, limit: int) -> list[dict]:
+        return await asyncio.to_thread(self.store.items, job_id, offset, limit)
+
+    async def _work(self):
+        while True:
+            self._wakeup.clear()
+            claimed = await asyncio.to_thread(self.store.claim, LEASE_SECONDS)
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=IDLE_POLL_SECONDS)
+                except TimeoutError:
+                    pass
+                continue
+            job_id, position, payload = claimed
+            self._running.add((job_id, position))
+            try:
+                await self._run(job_id, position, payload)
+            finally:
+                self._running.discard((job_id, position))
+
+    async def _renew_leases(self):
+        while True:
+            await asyncio.sleep(LEASE_SECONDS / 3)
+            if self._running:
+                await asyncio.to_thread(self.store.renew, list(self._running), LEASE_SECONDS)
+
+    async def _run(self, job_id: str, position: int, payload: dict):
+        item = VerifaiInput.model_validate(payload)
+        current_request_id.set(f"job-{job_id}")
+        stats = RequestStats(mode=item.mode.value)
+        current_stats.set(stats)
+        tasks = RunTasks()
+        current_tasks.set(tasks)
+        if not get_settings().CACHE_ENABLED:
+            scoped_cache.set(self._job_caches.setdefault(
+                job_id,
+                ResultCache(max_entries=get_settings().CACHE_MAX_ENTRIES, listener=record_cache_lookup)
+            ))
+        graph = get_graph()
+        config = {"configurable": {"thread_id": f"job-{job_id}-{position}"}, "callbacks": [UsageCallbackHandler(stats)]}
+        try:
+            graph_input = await resume_input(graph, config, item.input_text)
+            async with asyncio.timeout(get_settings().RUN_TIMEOUT_SECONDS):
+                output = await graph.ainvoke(graph_input, config=config, context=get_config(item.mode))
+            await forget(graph, config["configurable"]["thread_id"])
+            finished = await asyncio.to_thread(self.store.complete, job_id, position, to_jsonable_python(output))
+        except asyncio.CancelledError:
+            raise  # Released by stop(), or claimed again once its lease runs out
+        except TimeoutError:
+            logger.warning("batch job %s item %d stopped at its %.0fs deadline", job_id, position, get_settings().RUN_TIMEOUT_SECONDS)
+            await forget(graph, config["configurable"]["thread_id"])
+            finished = await asyncio.to_thread(self.store.fail, job_id, position, "Run deadline exceeded")
+        except Exception as error:
+            logger.exception("batch job %s item %d failed", job_id, position)
+            await forget(graph, config["configurable"]["thread_id"])
+            finished = await asyncio.to_thread(self.store.fail, job_id, position, repr(error))
+        finally:
+            tasks.cancel()
+            scoped_cache.set(None)
+            stats.finish()
+        if finished:
+            self._job_caches.pop(job_id, None)
+            logger.info("batch job %s done", job_id)
+
+
+@lru_cache
+def get_batch_workers() -> BatchWorkers:
+    settings = get_settings()
+    return BatchWorkers(JobStore(settings.JOBS_PATH), settings.JOBS_WORKERS)
@@ -0,0 +1,25 @@
+"""Research time budget of a run, counted while the run is running"""
+
+import time
+from datetime import datetime
+
+from langgraph.config import get_config
+from langgraph.types import StateSnapshot
+
+# Key of the run config metadata holding the seconds a checkpointed run was stopped for. Saved with
+# every checkpoint, so it adds up over the successive resumes of a run
+PAUSED_KEY = "paused_seconds"
+
+
+def paused_seconds(state: StateSnapshot) -> float:
+    """Seconds a run continued from `state` has been stopped for, its earlier stops included"""
+    stopped_at = datetime.fromisoformat(state.created_at).timestamp()
+    return state.metadata.get(PAUSED_KEY, 0.0) + max(time.time() - stopped_at, 0.0)
+
+
+def past_deadline(deadline: float | None) -> bool:
+    """Whether an epoch deadline set by the run is past, the deadline moving by the time the run was stopped"""
+    if deadline is None:
+        return False
+    paused = (get_config().get("metadata") or {}).get(PAUSED_KEY, 0.0)
+    return time.time() - paused > deadline
@@ -0,0 +1,36 @@
+"""Result cache shared by the Verifai agents"""
+
+from contextvars import ContextVar
+from functools import lru_cache
+
+from api.common.cache import ResultCache
+from api.common.singleflight import SingleFlight
+from api.settings import get_settings
+from .instrumentation import record_cache_lookup
+
+# Cache of the work unit being run (e.g. a batch job), takes precedence over the process-wide cache
+scoped_cache: ContextVar[ResultCache | None] = ContextVar("scoped_cache", default=None)
+
+
+def get_cache() -> ResultCache:
+    """Cache for claims, search queries, search results and verdicts"""
+    return scoped_cache.get() or _shared_cache()
+
+
+@lru_cache
+def get_single_flight() -> SingleFlight:
+    """Searches and verdicts in flight across every request, an identical call joins them instead of running again"""
+    return SingleFlight(listener=record_cache_lookup)
+
+
+@lru_cache
+def _shared_cache() -> ResultCache:
+    settings = get_settings()
+    if not settings.CACHE_ENABLED:
+        return ResultCache(max_entries=0, listener=record_cache_lookup)
+    return ResultCache(
+        settings.CACHE_PATH or None,
+        max_entries=settings.CACHE_MAX_ENTRIES,
+        ttl=settings.CACHE_TTL_SECONDS,
+        listener=record_cache_lookup
+    )
@@ -21,14 +21,27 @@ def get_all_configs():
     }
 
 # Default configuration
-_DEFAULT_CONFIG = VerifaiConfig()
+_DEFAULT_CONFIG = VerifaiConfig(
+    max_claims=15,
+    adaptive_confidence=0.75,
+    report_mode="sections"
+)
 
 # High-quality configuration (slower, more accurate)
+# Queries and first verdicts come from the small model, uncertain verdicts are given again by the large one
 _HIGH_QUALITY_CONFIG = VerifaiConfig(
     model_name="openai:gpt-4o",
+    node_models={"research_evidence": "openai:gpt-4o-mini", "verify_evidence": "openai:gpt-4o-mini"},
+    escalation_model="openai:gpt-4o",
+    escalation_confidence=0.8,
     max_search_results_per_query=5,
     max_queries_per_claim=3,
-    max_evidence_per_claim=10
+    max_evidence_per_claim=10,
+    evidence_token_budget=400,
+    max_claims=30,
+    adaptive_confidence=0.85,
+    local_evidence_min_hits=5,
+    local_evidence_max_age_seconds=24 * 3600
 )
 
 # Fast configuration (faster, lower cost)
@@ -37,5 +50,12 @@ _FAST_CONFIG = VerifaiConfig(
     max_search_results_per_query=2,
     max_queries_per_claim=1,
     max_evidence_per_claim=3,
-    search_depth="basic"
+    evidence_token_budget=120,
+    search_depth="basic",
+    verify_mode="packed",
+    max_claims=5,
+    time_budget_seconds=30,
+    report_mode="template",
+    local_evidence_min_hits=2,
+    local_evidence_max_age_seconds=30 * 24 * 3600
 )
@@ -0,0 +1,38 @@
+"""Diagrams of the Verifai graph topology, rendered once and served from memory"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+
+from .runs import get_graph
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Diagram:
+    content: bytes
+    media_type: str
+    etag: str
+
+
+def _diagram(content: bytes, media_type: str) -> Diagram:
+    return Diagram(content, media_type, f'"{hashlib.sha256(content).hexdigest()[:16]}"')
+
+
+@lru_cache
+def get_diagrams() -> dict[str, Diagram]:
+    """Mermaid text, JSON and, when pygraphviz is installed, PNG. Everything is rendered locally,
+    the Mermaid web service is never called"""
+    graph = get_graph().get_graph(xray=True)  # The compiled graph of the app, once it is running
+    diagrams = {
+        "mermaid": _diagram(graph.draw_mermaid().encode(), "text/plain; charset=utf-8"),
+        "json": _diagram(json.dumps(graph.to_json(), default=str).encode(), "application/json"),
+    }
+    try:
+        diagrams["png"] = _diagram(graph.draw_png(), "image/png")
+    except ImportError:
+        logger.warning("pygraphviz is not installed: the graph diagram is not available as PNG, /verifai/show serves Mermaid text")
+    return diagrams
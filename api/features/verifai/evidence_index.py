@@ -0,0 +1,43 @@
+"""Local index of every evidence fetched from the web, searched before the web"""
+
+import asyncio
+from functools import lru_cache
+
+from api.common.text_index import TextIndex
+from api.settings import get_settings
+from .instrumentation import record_cache_lookup
+from .models import Evidence, VerifaiConfig
+
+
+@lru_cache
+def get_evidence_index() -> TextIndex | None:
+    settings = get_settings()
+    if not settings.EVIDENCE_INDEX_ENABLED:
+        return None
+    return TextIndex(settings.EVIDENCE_INDEX_PATH, max_entries=settings.EVIDENCE_INDEX_MAX_ENTRIES)
+
+
+async def find_local_evidence(claim_text: str, config: VerifaiConfig) -> list[Evidence]:
+    """Fresh indexed evidence matching the claim, empty unless there is enough of it to skip the web search"""
+    index = get_evidence_index()
+    if index is None or config.local_evidence_min_hits == 0:
+        return []
+    matches = await asyncio.to_thread(
+        index.search, claim_text, config.max_evidence_per_claim * 2, config.local_evidence_max_age_seconds
+    )
+    evidence_list = [
+        Evidence(source=match["source"], snippet=match["snippet"][:config.snippet_max_length], relevance_score=match["score"])
+        for match in matches
+        if match["coverage"] >= config.local_evidence_min_coverage
+    ]
+    found = len(evidence_list) >= config.local_evidence_min_hits
+    record_cache_lookup("evidence_index", "hits" if found else "misses")
+    return evidence_list if found else []
+
+
+async def index_evidence(evidence_list: list[Evidence]):
+    index = get_evidence_index()
+    if index is not None and evidence_list:
+        await asyncio.to_thread(
+            index.add, [(evidence.source, evidence.snippet, evidence.relevance_score) for evidence in evidence_list]
+        )
@@ -0,0 +1,62 @@
+"""Evidence of a fact-check run, held once in memory. Research branches refer to it by id"""
+
+from contextvars import ContextVar
+from typing import Iterable
+
+from .models import Evidence, EvidenceRef
+
+
+class EvidenceRecord:
+    """Source and snippet of a piece of evidence"""
+    __slots__ = ("source", "snippet")
+
+    def __init__(self, source: str, snippet: str):
+        self.source = source
+        self.snippet = snippet
+
+
+class EvidenceStore:
+    """One record per distinct (source, snippet) of a run. Equal sources and snippets share a single string,
+    e.g. the URL of a page several snippets come from"""
+
+    def __init__(self):
+        self._records: list[EvidenceRecord] = []
+        self._ids: dict[tuple[str, str], int] = {}
+        self._strings: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add(self, source: str, snippet: str) -> int:
+        source = self._strings.setdefault(source, source)
+        snippet = self._strings.setdefault(snippet, snippet)
+        evidence_id = self._ids.get((source, snippet))
+        if evidence_id is None:
+            evidence_id = self._ids[source, snippet] = len(self._records)
+            self._records.append(EvidenceRecord(source, snippet))
+        return evidence_id
+
+    def ref(self, evidence: Evidence) -> EvidenceRef:
+        return self.add(evidence.source, evidence.snippet), evidence.relevance_score
+
+    def get(self, evidence_id: int) -> EvidenceRecord:
+        return self._records[evidence_id]
+
+    def evidence(self, refs: Iterable[EvidenceRef]) -> list[Evidence]:
+        """Models of referenced evidence, for verdicts and stream payloads"""
+        return [
+            Evidence(source=self._records[evidence_id].source, snippet=self._records[evidence_id].snippet, relevance_score=score)
+            for evidence_id, score in refs
+        ]
+
+
+# Store of the run in progress, set by the graph when a run starts (see graph.VerifaiGraph). A run's
+# branches share it, the next run gets a new one
+current_evidence: ContextVar[EvidenceStore | None] = ContextVar("current_evidence", default=None)
+
+
+def get_evidence_store() -> EvidenceStore:
+    store = current_evidence.get(None)
+    if store is None:
+        raise LookupError("No evidence store, the graph was not built by `build_graph`")
+    return store
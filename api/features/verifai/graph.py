@@ -1,48 +1,111 @@
 from langgraph.graph import StateGraph, START, END
+from langgraph.graph.state import CompiledStateGraph
+from langgraph.runtime import Runtime
 from langgraph.types import Send
 
+from api.common.text import normalize_text
 from .models import (
     VerifaiInputState, 
     VerifaiOutputState, 
     VerifaiConfig, 
     FactCheckState,
     VerifaiState)
+from .evidence_store import EvidenceStore, current_evidence
 from .agents import (
     extract_claims, 
+    cluster_claims,
+    select_claims,
     research_evidence, 
+    process_evidence,
     verify_evidence,
+    queue_verification,
+    verify_claims,
+    write_section,
     generate_report
 )
 
+class VerifaiGraph(CompiledStateGraph):
+    """Compiled main graph, each run (invoke or stream) gets a new evidence store shared by its branches"""
+
+    async def astream(self, *args, **kwargs):
+        if current_evidence.get() is not None:  # Nested in a run that has its store
+            async for chunk in super().astream(*args, **kwargs):
+                yield chunk
+            return
+        current_evidence.set(EvidenceStore())
+        try:
+            async for chunk in super().astream(*args, **kwargs):
+                yield chunk
+        finally:
+            current_evidence.set(None)  # The evidence of the run goes with it
+
+def _route_verification(state: FactCheckState, runtime: Runtime[VerifaiConfig]):
+    if state.get("deferred_claims"):
+        return END
+    # Batched modes defer verification to the main graph once every claim is researched
+    return "verify_evidence" if runtime.context.verify_mode == "per_claim" else "queue_verification"
+
+def _route_after_verdict(state: FactCheckState, runtime: Runtime[VerifaiConfig]):
+    # An uncertain first verdict sends the claim back to research with the full search settings
+    if state.get("escalated") and not state.get("verdicts"):
+        return "research_evidence"
+    return "write_section" if runtime.context.report_mode == "sections" else END
+
 def _build_fact_check_graph():
     fact_check_builder = StateGraph(FactCheckState,
         context_schema=VerifaiConfig)
     fact_check_builder.add_node("research_evidence", research_evidence)
+    fact_check_builder.add_node("process_evidence", process_evidence)
     fact_check_builder.add_node("verify_evidence", verify_evidence)
+    fact_check_builder.add_node("queue_verification", queue_verification)
+    fact_check_builder.add_node("write_section", write_section)
     fact_check_builder.add_edge(START, "research_evidence")
-    fact_check_builder.add_edge("research_evidence", "verify_evidence")
-    fact_check_builder.add_edge("verify_evidence", END)
-    return fact_check_builder.compile()
+    fact_check_builder.add_edge("research_evidence", "process_evidence")
+    fact_check_builder.add_conditional_edges("process_evidence", _route_verification, ["verify_evidence", "queue_verification", END])
+    fact_check_builder.add_conditional_edges("verify_evidence", _route_after_verdict, ["research_evidence", "write_section", END])
+    fact_check_builder.add_edge("write_section", END)
+    fact_check_builder.add_edge("queue_verification", END)
+    # Branch state refers to the in-memory evidence store of the run, it is not checkpointed: an interrupted
+    # branch runs again from its research. Its outputs (verdicts, researched claims) are checkpointed in full
+    return fact_check_builder.compile(checkpointer=False)
 
-def _send_to_research_teams(state: VerifaiState):                        
+def _send_to_research_teams(state: VerifaiState):
+    claims = state["claims"]
+    queries = state.get("claim_queries", {})
     return [
-        Send("research_team", {"index": index,"claim": claim}) 
-        for index, claim in enumerate(state["claims"])]
+        Send("research_team", {
+            "index": group[0],
+            "claim": claims[group[0]],
+            "duplicates": [(index, claims[index]) for index in group[1:]],
+            "deadline": state.get("research_deadline"),
+            "queries": queries.get(normalize_text(claims[group[0]].text))
+        })
+        for group in state["claim_groups"]]
+
+def _route_after_research(state: VerifaiState, runtime: Runtime[VerifaiConfig]):
+    return "generate_report" if runtime.context.verify_mode == "per_claim" else "verify_claims"
 
-def build_graph():
+def build_graph(checkpointer=None):
     main_builder = StateGraph(VerifaiState, 
         input_schema=VerifaiInputState, 
         output_schema=VerifaiOutputState, 
         context_schema=VerifaiConfig)
 
     main_builder.add_node("extract_claims", extract_claims)  # Add the answer node
+    main_builder.add_node("cluster_claims", cluster_claims)
+    main_builder.add_node("select_claims", select_claims)
     main_builder.add_node("research_team", _build_fact_check_graph())
+    main_builder.add_node("verify_claims", verify_claims)
     main_builder.add_node("generate_report", generate_report)
 
 
     main_builder.add_edge(START, "extract_claims")
-    main_builder.add_conditional_edges("extract_claims", _send_to_research_teams, ["research_team"]) #Map-reduce to evidence research. Parallelize each claim to check
-    main_builder.add_edge("research_team", "generate_report")
+    main_builder.add_edge("extract_claims", "cluster_claims")
+    main_builder.add_edge("cluster_claims", "select_claims")
+    main_builder.add_conditional_edges("select_claims", _send_to_research_teams, ["research_team"]) #Map-reduce to evidence research. Parallelize each claim to check
+    main_builder.add_conditional_edges("research_team", _route_after_research, ["verify_claims", "generate_report"])
+    main_builder.add_edge("verify_claims", "generate_report")
     main_builder.add_edge("generate_report", END)
-    return main_builder.compile()  # Compile the graph
-
+    graph = main_builder.compile(checkpointer=checkpointer)  # Compile the graph
+    graph.__class__ = VerifaiGraph  # Same graph, StateGraph.compile has no option for a subclass
+    return graph
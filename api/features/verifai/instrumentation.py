@@ -0,0 +1,145 @@
+"""Latency, token, cost and cache instrumentation of the Verifai graph"""
+
+import functools
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from api.common.metrics import registry
+
+NODE_DURATION = registry.histogram("verifai_node_duration_seconds", "Wall time of graph nodes", ["node", "mode"])
+REQUEST_DURATION = registry.histogram("verifai_request_duration_seconds", "Wall time of fact-check runs", ["mode"])
+PROVIDER_CALL_DURATION = registry.histogram("verifai_provider_call_duration_seconds", "Wall time of external calls, queue wait excluded", ["provider"])
+PROVIDER_QUEUE_WAIT = registry.histogram("verifai_provider_queue_wait_seconds", "Time waited for a provider call slot", ["provider"])
+TOKENS = registry.counter("verifai_llm_tokens_total", "LLM tokens", ["mode", "model", "kind"])
+COST = registry.counter("verifai_llm_cost_usd_total", "Estimated LLM cost in USD", ["mode", "model"])
+CACHE_LOOKUPS = registry.counter("verifai_cache_lookups_total", "Result cache lookups", ["namespace", "outcome"])
+VERDICTS = registry.counter("verifai_verdicts_total", "Verdicts given, escalated ones were given again by the escalation model", ["mode", "escalated"])
+
+# USD per million (input, output) tokens, matched on the model name prefix
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    for prefix in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(prefix):
+            input_price, output_price = MODEL_PRICES[prefix]
+            return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    return 0.0
+
+
+@dataclass
+class RequestStats:
+    """Measurements of a single fact-check run, sent as the final `stats` stream event"""
+    mode: str
+    started_at: float = field(default_factory=time.perf_counter)
+    nodes: dict[str, dict] = field(default_factory=dict)
+    providers: dict[str, dict] = field(default_factory=dict)
+    tokens: dict[str, dict] = field(default_factory=dict)
+    cost_usd: float = 0.0
+    cache: dict[str, int] = field(default_factory=dict)
+    verdicts: dict[str, int] = field(default_factory=lambda: {"total": 0, "escalated": 0})
+
+    def record_node(self, node: str, seconds: float):
+        entry = self.nodes.setdefault(node, {"calls": 0, "seconds": 0.0})
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+
+    def record_provider_call(self, provider: str, queue_wait: float, seconds: float):
+        entry = self.providers.setdefault(provider, {"calls": 0, "seconds": 0.0, "queue_wait_seconds": 0.0})
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+        entry["queue_wait_seconds"] += queue_wait
+
+    def record_usage(self, model: str, prompt_tokens: int, completion_tokens: int):
+        entry = self.tokens.setdefault(model, {"prompt": 0, "completion": 0})
+        entry["prompt"] += prompt_tokens
+        entry["completion"] += completion_tokens
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        self.cost_usd += cost
+        TOKENS.inc(prompt_tokens, mode=self.mode, model=model, kind="prompt")
+        TOKENS.inc(completion_tokens, mode=self.mode, model=model, kind="completion")
+        COST.inc(cost, mode=self.mode, model=model)
+
+    def record_verdict(self, escalated: bool):
+        self.verdicts["total"] += 1
+        self.verdicts["escalated"] += escalated
+
+    def finish(self) -> dict:
+        duration = time.perf_counter() - self.started_at
+        REQUEST_DURATION.observe(duration, mode=self.mode)
+        return {
+            "mode": self.mode,
+            "duration_seconds": duration,
+            "nodes": self.nodes,
+            "providers": self.providers,
+            "tokens": self.tokens,
+            "cost_usd": self.cost_usd,
+            "cache": self.cache,
+            "verdicts": self.verdicts,
+        }
+
+
+current_stats: ContextVar[RequestStats | None] = ContextVar("current_stats", default=None)
+
+
+def instrumented(node):
+    """Record the wall time of a graph node in the node histogram and the current request stats"""
+    @functools.wraps(node)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = node(*args, **kwargs)
+            return await result if hasattr(result, "__await__") else result
+        finally:
+            seconds = time.perf_counter() - started
+            stats = current_stats.get()
+            NODE_DURATION.observe(seconds, node=node.__name__, mode=stats.mode if stats else "")
+            if stats:
+                stats.record_node(node.__name__, seconds)
+    return wrapper
+
+
+def record_provider_call(provider: str, queue_wait: float, seconds: float):
+    PROVIDER_QUEUE_WAIT.observe(queue_wait, provider=provider)
+    PROVIDER_CALL_DURATION.observe(seconds, provider=provider)
+    if stats := current_stats.get():
+        stats.record_provider_call(provider, queue_wait, seconds)
+
+
+def record_cache_lookup(namespace: str, outcome: str):
+    CACHE_LOOKUPS.inc(namespace=namespace, outcome=outcome)
+    if stats := current_stats.get():
+        stats.cache[outcome] = stats.cache.get(outcome, 0) + 1
+
+
+def record_verdict(escalated: bool):
+    stats = current_stats.get()
+    VERDICTS.inc(mode=stats.mode if stats else "", escalated=str(escalated).lower())
+    if stats:
+        stats.record_verdict(escalated)
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """Collect the token usage of every LLM call of a run"""
+    run_inline = True
+
+    def __init__(self, stats: RequestStats):
+        self.stats = stats
+
+    def on_llm_end(self, response: LLMResult, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    model = message.response_metadata.get("model_name", "unknown")
+                    self.stats.record_usage(model, usage.get("input_tokens", 0), usage.get("output_tokens", 0))
@@ -0,0 +1,98 @@
+"""Process-wide registry of the chat models used by the Verifai agents"""
+
+from functools import lru_cache
+from typing import Callable
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers.openai_tools import JsonOutputKeyToolsParser
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from pydantic import BaseModel, SecretStr
+
+from api.common.http import get_http_client
+from api.settings import get_settings
+from .scheduler import provider_call
+
+# Builds the chat model of a (model, temperature) pair instead of the provider SDK, e.g. the benchmark stubs
+_model_factory: Callable[[str, float], BaseChatModel] | None = None
+
+
+def provider_of(model_name: str) -> str:
+    """Provider prefix of a model name ("openai:gpt-4o-mini" -> "openai")"""
+    provider, _, model = model_name.partition(":")
+    return provider if model else "openai"
+
+
+@lru_cache(maxsize=None)
+def _init_model(model_name: str, temperature: float) -> BaseChatModel:
+    if _model_factory is not None:
+        return _model_factory(model_name, temperature)
+    return build_provider_model(model_name, temperature)
+
+
+def build_provider_model(model_name: str, temperature: float) -> BaseChatModel:
+    """Chat model of the provider SDK, backed by the provider pooled HTTP client"""
+    from langchain.chat_models import init_chat_model  # Imports the provider SDK, deferred to the first model
+
+    kwargs = {}
+    if provider_of(model_name) == "openai":
+        kwargs["http_async_client"] = get_http_client("openai")
+        kwargs["stream_usage"] = True  # Off by default with a custom client, streamed calls would report no tokens
+    return init_chat_model(
+        api_key=SecretStr(get_settings().OPENAI_API_KEY),
+        model=model_name,
+        temperature=temperature,
+        **kwargs
+    )
+
+
+def _scheduled(runnable: Runnable, provider: str) -> Runnable:
+    """Wrap a model runnable so that every call first waits for a slot of the provider limiter"""
+    async def call(input, config: RunnableConfig):
+        async with provider_call(provider):
+            return await runnable.ainvoke(input, config)
+    return RunnableLambda(call, name=f"{provider}_scheduled")
+
+
+def _scheduled_stream(runnable: Runnable, provider: str) -> Runnable:
+    """Same as `_scheduled` for streamed calls, the slot is held until the stream ends"""
+    async def stream(input, config: RunnableConfig):
+        async with provider_call(provider):
+            async for chunk in runnable.astream(input, config):
+                yield chunk
+    return RunnableLambda(stream, name=f"{provider}_scheduled")
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(model_name: str, temperature: float) -> Runnable:
+    """Shared chat model for a (model, temperature) pair, backed by the provider pooled HTTP client"""
+    return _scheduled(_init_model(model_name, temperature), provider_of(model_name))
+
+
+@lru_cache(maxsize=None)
+def get_structured_model(model_name: str, temperature: float, schema: type[BaseModel]) -> Runnable:
+    """Shared structured output runnable for a (model, temperature, output schema) triple"""
+    return _scheduled(_init_model(model_name, temperature).with_structured_output(schema), provider_of(model_name))
+
+
+@lru_cache(maxsize=None)
+def get_streaming_structured_model(model_name: str, temperature: float, schema: type[BaseModel]) -> Runnable:
+    """Structured output runnable whose `astream` yields the output as it is generated: dicts holding the fields
+    parsed so far, the last one complete. The schema is requested as a forced tool call, whose arguments stream"""
+    model = _init_model(model_name, temperature).bind_tools([schema], tool_choice=schema.__name__)
+    parser = JsonOutputKeyToolsParser(key_name=schema.__name__, first_tool_only=True)
+    return _scheduled_stream(model | parser, provider_of(model_name))
+
+
+def set_model_factory(factory: Callable[[str, float], BaseChatModel] | None):
+    """Build every chat model with `factory` from now on, None restores the provider SDKs"""
+    global _model_factory
+    _model_factory = factory
+    clear_models()
+
+
+def clear_models():
+    """Drop every registered model, e.g. once the pooled HTTP clients are closed"""
+    get_structured_model.cache_clear()
+    get_streaming_structured_model.cache_clear()
+    get_chat_model.cache_clear()
+    _init_model.cache_clear()
@@ -1,11 +1,12 @@
 """Data models for the Verifai workflow"""
 
-from typing import List, Literal
+from typing import Dict, List, Literal, Optional, Tuple
 from pydantic import BaseModel, Field
 from typing_extensions import TypedDict, Annotated
-import operator
 from enum import StrEnum
 
+from api.common.channels import AppendList
+
 
 class VerifaiModeEnum(StrEnum):
     """ Avaiable mode for the fact check workflow. Impacts used LLM and research depth. See VerifaiConfig class """
@@ -18,6 +19,10 @@ class VerifaiInput(BaseModel):
     input_text: str = Field(..., description="Text to fact check")
     mode: VerifaiModeEnum = Field(default=VerifaiModeEnum.DEFAULT, description="Workflow mode. [default|fast|high]")
 
+class VerifaiBatchInput(BaseModel):
+    """ Input for the batch endpoint """
+    items: List[VerifaiInput] = Field(..., min_length=1, max_length=10000, description="Texts to fact check")
+
 
 
 
@@ -45,6 +50,10 @@ class Evidence(BaseModel):
     relevance_score: float = Field(default=0.0, description="How relevant this evidence is (0-1)")
 
 
+# (id in the run EvidenceStore, relevance score to the claim): evidence as research branches hold it
+EvidenceRef = Tuple[int, float]
+
+
 class VerdictOutput(BaseModel):
     """Verification verdict output from LLM (without evidence)"""
     status: Literal["SUPPORTS", "REFUTES", "NOT ENOUGH INFO"] = Field(
@@ -55,6 +64,16 @@ class VerdictOutput(BaseModel):
     evidence_ids_used: List[int] = Field(default_factory=list, description="Liste of evidence ids used for the verdict")
 
 
+class ClaimVerdictOutput(VerdictOutput):
+    """Verdict of one claim in a multi-claim verification output"""
+    claim_id: int = Field(description="Id of the verified claim")
+
+
+class ClaimVerdictsOutput(BaseModel):
+    """Verification verdicts of several claims from a single LLM call"""
+    verdicts: List[ClaimVerdictOutput] = Field(description="One verdict per claim")
+
+
 class Verdict(BaseModel):
     """Verification verdict for a claim"""
     claim: str = Field(description="The original claim")
@@ -66,6 +85,14 @@ class Verdict(BaseModel):
     evidence_used: List[Evidence] = Field(default_factory=list, description="Evidence supporting this verdict")
 
 
+class ResearchedClaim(BaseModel):
+    """Claim with the evidence gathered by its research team, waiting for batched verification"""
+    index: int = Field(description="Index of the claim in the extracted claims list")
+    claim: Claim
+    evidence_list: List[Evidence] = Field(default_factory=list)
+    duplicates: List[Tuple[int, Claim]] = Field(default_factory=list, description="Indexed claims sharing this claim verdict")
+
+
 class VerifaiInputState(TypedDict):
     """ Input state for the Verifai main graph"""
     input_text: str
@@ -75,18 +102,31 @@ class FactCheckState(TypedDict):
     """ Internal state for Evidence research teams subgraph """
     index: int
     claim: Claim
-    evidence_list: List[Evidence]
+    duplicates: List[Tuple[int, Claim]]  # Near-identical claims that get a copy of this claim verdict
+    deadline: Optional[float]  # Epoch time after which the claim is deferred instead of researched
+    escalated: bool  # Whether the claim is researched again with the full settings after an uncertain first verdict
+    queries: Optional[List[str]]  # Search queries of the first research round, generated during the extraction
+    evidence_refs: List[EvidenceRef]
+    verdicts: Annotated[List[Verdict], AppendList]
+    deferred_claims: Annotated[List[Claim], AppendList]
+    researched_claims: Annotated[List[ResearchedClaim], AppendList]
+    report_sections: Annotated[List[Tuple[str, str]], AppendList]
     
 class VerifaiOutputState(TypedDict):
     """ Output state for the Verifai main graph"""
     claims: List[Claim]
-    verdicts:  Annotated[List[Verdict], operator.add]  # Reducer to aggregate verdicts from each parallel
+    verdicts:  Annotated[List[Verdict], AppendList]  # Aggregates the verdicts of each parallel branch
+    deferred_claims: Annotated[List[Claim], AppendList]  # Claims left unverified once the mode budget ran out
     final_report: str
     error: str
 
 class VerifaiState(VerifaiInputState, VerifaiOutputState):
     """ Global state for the Verifai main graph """
-    pass
+    claim_groups: List[List[int]]  # Indexes of near-identical claims, the first one of each group is researched
+    claim_queries: Dict[str, List[str]]  # Normalized claim text to the search queries of its first research round
+    research_deadline: Optional[float]
+    researched_claims: Annotated[List[ResearchedClaim], AppendList]  # Claims waiting for batched verification
+    report_sections: Annotated[List[Tuple[str, str]], AppendList]  # (claim, explanation) written as soon as the claim is verified
 
 
 class VerifaiReport(BaseModel):
@@ -97,6 +137,9 @@ class VerifaiReport(BaseModel):
     summary: str
     timestamp: str
 
+# Nodes calling a model, see VerifaiConfig.node_models
+ModelNode = Literal["extract_claims", "research_evidence", "verify_evidence", "verify_claims", "generate_report"]
+
 class VerifaiConfig(BaseModel):
     """Configuration for the fact-checking workflow"""
     
@@ -111,7 +154,51 @@ class VerifaiConfig(BaseModel):
         ge=0.0,
         le=2.0
     )
+    node_models: Dict[ModelNode, str] = Field(
+        default_factory=dict,
+        description="Model of a node in place of model_name (research_evidence generates the search queries)"
+    )
+    escalation_model: Optional[str] = Field(
+        default=None,
+        description="Stronger model a verdict is given again by when it is NOT ENOUGH INFO or under escalation_confidence (None = no cascade)"
+    )
+    escalation_confidence: float = Field(
+        default=0.7,
+        description="Confidence under which a verdict is escalated to escalation_model",
+        ge=0.0,
+        le=1.0
+    )
     
+    # Claim settings
+    extraction_chunk_chars: int = Field(
+        default=6000,
+        description="Inputs longer than this (characters) are split into chunks whose claims are extracted concurrently",
+        ge=500
+    )
+    extraction_chunk_overlap: int = Field(
+        default=300,
+        description="Characters of the previous chunk repeated at the start of the next one",
+        ge=0
+    )
+    claim_similarity_threshold: float = Field(
+        default=0.9,
+        description="Character shingles overlap (Jaccard) from which claims are merged and researched once, sharing a verdict. Claims differing in numbers, content words or negations are never merged (1.0 = exact duplicates only)",
+        ge=0.0,
+        le=1.0
+    )
+
+    # Budget settings
+    max_claims: Optional[int] = Field(
+        default=None,
+        description="Maximum number of claims researched per request, highest priority first (None = no limit)",
+        ge=1
+    )
+    time_budget_seconds: Optional[float] = Field(
+        default=None,
+        description="Time allowed to research claims. Claims not researched in time are deferred (None = no limit)",
+        gt=0.0
+    )
+
     # Search settings
     max_search_results_per_query: int = Field(
         default=3,
@@ -129,7 +216,52 @@ class VerifaiConfig(BaseModel):
         default="advanced",
         description="Tavily search depth (basic or advanced)"
     )
+    search_timeout: float = Field(
+        default=15.0,
+        description="Timeout for a single search query (seconds)",
+        gt=0.0,
+        le=120.0
+    )
     
+    # Adaptive research settings
+    adaptive_confidence: Optional[float] = Field(
+        default=None,
+        description="Confidence from which the verdict of a cheap first research round is kept. Below it, or on NOT ENOUGH INFO, the claim is researched again with the full search settings (None = a single full round, per_claim verify mode only)",
+        ge=0.0,
+        le=1.0
+    )
+    initial_queries_per_claim: int = Field(
+        default=1,
+        description="Search queries of the first adaptive research round (basic depth)",
+        ge=1,
+        le=5
+    )
+    initial_results_per_query: int = Field(
+        default=2,
+        description="Search results per query of the first adaptive research round",
+        ge=1,
+        le=10
+    )
+
+    # Local evidence index settings
+    local_evidence_min_hits: int = Field(
+        default=3,
+        description="Matching pieces of indexed evidence from which a claim is answered without a web search (0 = always search the web)",
+        ge=0,
+        le=20
+    )
+    local_evidence_min_coverage: float = Field(
+        default=0.6,
+        description="Share of the claim terms an indexed snippet must contain to count as a match",
+        ge=0.0,
+        le=1.0
+    )
+    local_evidence_max_age_seconds: float = Field(
+        default=7 * 24 * 3600,
+        description="Indexed evidence older than this is not used (seconds)",
+        gt=0.0
+    )
+
     # Evidence settings
     max_evidence_per_claim: int = Field(
         default=5,
@@ -151,6 +283,32 @@ class VerifaiConfig(BaseModel):
         ge=1,
         le=10
     )
+    evidence_token_budget: Optional[int] = Field(
+        default=200,
+        description="Tokens of evidence in a verdict prompt, filled with the snippet sentences closest to the claim (None = whole snippets)",
+        ge=50,
+        le=4000
+    )
+    verify_mode: Literal["per_claim", "batched", "packed"] = Field(
+        default="per_claim",
+        description="per_claim: each research team verifies its claim, batched: verdicts of all claims are requested together once research is done, packed: all claims are verified in a single structured call"
+    )
+    verify_concurrency: int = Field(
+        default=8,
+        description="Maximum number of concurrent verdict calls in batched mode",
+        ge=1,
+        le=64
+    )
+
+
+    # Report settings
+    report_mode: Literal["full", "sections", "template"] = Field(
+        default="full",
+        description="full: one report call once every claim is verified, sections: an explanation per claim written as soon as it is verified then a short summary call, template: rendered from the verdicts without any call"
+    )
+
+    def model_for(self, node: str) -> str:
+        return self.node_models.get(node, self.model_name)
 
     
     class Config:
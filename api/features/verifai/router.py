@@ -1,66 +1,137 @@
-from fastapi import APIRouter
-from fastapi.responses import Response, StreamingResponse
-from typing import AsyncGenerator
-from langchain_core.messages import AIMessageChunk
-import json
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
+from typing import Literal
+import asyncio
+from uuid import uuid4
 
-from api.common.utils import to_serializable
-
-from .config import get_all_configs, get_config
-from .graph import build_graph
-from .models import VerifaiInput
+from api.common.streaming import EventStreamResponse, accepts_gzip, gzip_frames
+from api.settings import get_settings
 
+from .batch import get_batch_workers
+from .cache import get_cache
+from .config import get_all_configs
+from .diagram import get_diagrams
+from .models import VerifaiInput, VerifaiBatchInput
+from .runs import get_run_log, is_active, stream_run
+from .scheduler import scheduler_stats
+from .stream import StreamEncoder
 
 router = APIRouter(prefix="/verifai", tags=["VerifAI"])
 
-graph = build_graph()
-
 @router.get("/modes")
 async def get_available_modes():
     return get_all_configs()
 
 
+@router.get("/stats")
+async def get_stats():
+    return {"cache": get_cache().stats(), "scheduler": scheduler_stats()}
+
+
 @router.post("/run")
-async def run_workflow(body: VerifaiInput):
-    print(f"New verifai request.Mode: {body.mode}, Input text: {body.input_text} ")
-
-    async def event_generator() -> AsyncGenerator[str, None]:
-        yield json.dumps({"event": "start", "payload": {"input": body.input_text }}) + "\n"
-        # astream returns a tuple, 
-        # * _ is a dict indicating namespace graph (main is (), subgraph is {"research_team": <id>}),
-        # * mode is the stream mode (ie. either messages or custom)
-        # * data is the stream payload. 
-        #    * Messages event are a tuple with AIMessageChunk object and langgraph node metadata,
-        #    * Custom events are the payload from the writer function 
-        async for _, mode, chunk in graph.astream(
-            {"input_text": body.input_text},
-            subgraphs= True, # Needed to stream subgraphs events
-            stream_mode=["messages", "custom"], # Messages for report tokens and custom_data for node custom events
-            context=get_config(body.mode)
-        ):
-            if mode == "messages":
-                msg, metadata = chunk
-                if (
-                    isinstance(metadata, dict) 
-                    and metadata.get("langgraph_node") == "generate_report"
-                    and isinstance(msg, AIMessageChunk)
-                    and msg.content
-                ):
-                    data = {"type": "token", "content": msg.content}
-                    yield json.dumps(data) + "\n"
-
-            elif mode == "custom":
-                data = {"type": "event", "content": chunk}
-                print(chunk)
-                yield json.dumps(to_serializable(data)) + "\n"
-
-        # Optionnel : message de fin de stream
-        yield json.dumps({"event": "done"}) + "\n"
-
-    return StreamingResponse(event_generator(), media_type="application/json")
+async def run_workflow(
+    body: VerifaiInput,
+    request: Request,
+    format: Literal["ndjson", "sse"] = Query("ndjson", description="NDJSON lines or server-sent events"),
+    compress: bool = Query(False, description="Gzip the stream when the client accepts it"),
+    timeout: float | None = Query(None, gt=0, description="Seconds the run may take, at most RUN_TIMEOUT_SECONDS")
+):
+    """Stream the fact check events, see `stream.py` for the protocol. The run id comes in the `start` frame,
+    identical requests in flight share one run"""
+    _check_input_size([body])
+    frames = stream_run(uuid4().hex, body, StreamEncoder(format), timeout=_run_timeout(timeout))
+    return _streaming_response(frames, request, format, compress)
+
+
+@router.get("/runs/{run_id}")
+async def get_run(run_id: str):
+    run = await asyncio.to_thread(get_run_log().run, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Unknown run")
+    return {**run, "streaming": is_active(run_id)}
+
+
+@router.post("/runs/{run_id}/resume")
+async def resume_run(
+    run_id: str,
+    request: Request,
+    offset: int = Query(0, ge=0, description="Sequence number of the first frame to replay"),
+    format: Literal["ndjson", "sse"] = Query("ndjson"),
+    compress: bool = Query(False),
+    timeout: float | None = Query(None, gt=0)
+):
+    """Replay the frames of a run from `offset` (or after the SSE `Last-Event-ID`), then follow it while it streams
+    or continue it from its last checkpoint"""
+    run = await asyncio.to_thread(get_run_log().run, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Unknown run")
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id is not None and last_event_id.isdigit():
+        offset = int(last_event_id) + 1
+    frames = stream_run(run_id, VerifaiInput.model_validate(run["input"]), StreamEncoder(format), offset, _run_timeout(timeout))
+    return _streaming_response(frames, request, format, compress)
+
+
+def _check_input_size(items: list[VerifaiInput]):
+    limit = get_settings().MAX_INPUT_CHARS
+    if any(len(item.input_text) > limit for item in items):
+        raise HTTPException(status_code=413, detail=f"Texts are limited to {limit} characters")
+
+
+def _run_timeout(timeout: float | None) -> float:
+    limit = get_settings().RUN_TIMEOUT_SECONDS
+    return min(timeout, limit) if timeout else limit
+
+
+def _streaming_response(frames, request: Request, format: str, compress: bool) -> EventStreamResponse:
+    """The run is cancelled as soon as its last client disconnects"""
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    if compress and accepts_gzip(request):
+        return EventStreamResponse(gzip_frames(frames), media_type=media_type, headers={"Content-Encoding": "gzip"})
+    return EventStreamResponse(frames, media_type=media_type)
+
+
+@router.post("/batch")
+async def submit_batch(body: VerifaiBatchInput):
+    """Queue many texts for background fact checking, poll the returned job for progress and results"""
+    _check_input_size(body.items)
+    job_id = await get_batch_workers().submit(body.items)
+    return {"job_id": job_id, "total": len(body.items)}
+
+
+@router.get("/batch/{job_id}")
+async def get_batch(job_id: str):
+    job = await get_batch_workers().job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
+@router.get("/batch/{job_id}/results")
+async def get_batch_results(job_id: str, offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)):
+    workers = get_batch_workers()
+    job = await workers.job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return {**job, "offset": offset, "items": await workers.items(job_id, offset, limit)}
 
 
 @router.get("/show")
-async def shwo_workflow():
-    bytes = graph.get_graph(xray=True).draw_mermaid_png()
-    return Response(content=bytes, media_type="image/png")
\ No newline at end of file
+async def show_workflow(
+    request: Request,
+    format: Literal["png", "mermaid", "json"] | None = Query(None, description="PNG by default, Mermaid text when PNG is not available")
+):
+    """Diagram of the graph, rendered at startup. PNG needs pygraphviz (and Graphviz), which is not a dependency
+    of the app: without it, a request with no format gets the Mermaid text, flagged by an `X-Diagram-Fallback:
+    mermaid` header, and `format=png` gets a 404 listing the formats available"""
+    diagrams = get_diagrams()
+    fallback = format is None and "png" not in diagrams
+    diagram = diagrams.get("mermaid" if fallback else format or "png")
+    if diagram is None:
+        raise HTTPException(status_code=404, detail=f"Diagram formats available: {', '.join(diagrams)}")
+    headers = {"ETag": diagram.etag, "Cache-Control": "public, max-age=3600"}
+    if fallback:
+        headers["X-Diagram-Fallback"] = "mermaid"
+    if request.headers.get("if-none-match") == diagram.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=diagram.content, media_type=diagram.media_type, headers=headers)
\ No newline at end of file
@@ -0,0 +1,254 @@
+"""Checkpointed fact-check runs: the graph state is saved after every step so that a dropped run resumes where it stopped"""
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator
+
+import aiosqlite
+from langchain_core.messages import AIMessageChunk
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from api.common.broadcast import Broadcast, Subscription
+from api.common.limiter import current_request_id
+from api.common.runs import RunLog
+from api.common.tasks import RunTasks, current_tasks
+from api.common.text import normalize_text
+from api.settings import get_settings
+from .budget import PAUSED_KEY, paused_seconds
+from .config import get_config
+from .graph import build_graph
+from .instrumentation import RequestStats, UsageCallbackHandler, current_stats
+from .models import VerifaiInput, Claim, Evidence, Verdict, ResearchedClaim
+from .stream import PROTOCOL_VERSION, StreamEncoder
+
+logger = logging.getLogger(__name__)
+
+# Models found in the graph state, allowed to be restored from checkpoints
+CHECKPOINTED_MODELS = [(model.__module__, model.__name__) for model in (Claim, Evidence, Verdict, ResearchedClaim)]
+
+_checkpointed_graph = None
+_broadcasts: dict[str, Broadcast[tuple[int, str, bytes]]] = {}  # Frames of the runs streamed by this process
+_coalesced: dict[tuple[str, str], str] = {}  # (mode, normalized text) of the new runs in flight, to their run id
+
+
+@asynccontextmanager
+async def checkpointing():
+    """Compile the graph with the persistent checkpointer for the lifetime of the app"""
+    global _checkpointed_graph
+    path = get_settings().RUNS_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    async with aiosqlite.connect(path) as connection:
+        saver = AsyncSqliteSaver(connection, serde=JsonPlusSerializer(allowed_msgpack_modules=CHECKPOINTED_MODELS))
+        _checkpointed_graph = build_graph(checkpointer=saver)
+        try:
+            yield
+        finally:
+            _checkpointed_graph = None
+
+
+def get_graph():
+    """Checkpointed graph while the app runs, a plain graph otherwise (e.g. in the benchmark)"""
+    return _checkpointed_graph or _plain_graph()
+
+
+@lru_cache
+def _plain_graph():
+    return build_graph()
+
+
+@lru_cache
+def get_run_log() -> RunLog:
+    settings = get_settings()
+    return RunLog(settings.RUNS_PATH, ttl=settings.RUNS_TTL_SECONDS)
+
+
+def is_active(run_id: str) -> bool:
+    return run_id in _broadcasts
+
+
+async def resume_input(graph, config: dict, input_text: str) -> dict | None:
+    """Input of a run on a checkpointed thread: None to continue its pending steps, the text to start over.
+    A continued run gets the time it was stopped for in its metadata, its research deadline moves by as much"""
+    if graph.checkpointer is None:
+        return {"input_text": input_text}
+    state = await graph.aget_state(config)
+    if not state.next:
+        return {"input_text": input_text}
+    config.setdefault("metadata", {})[PAUSED_KEY] = paused_seconds(state)
+    return None
+
+
+async def forget(graph, thread_id: str):
+    """Drop the checkpoints of a finished run, its output is kept elsewhere"""
+    if graph.checkpointer is not None:
+        await graph.checkpointer.adelete_thread(thread_id)
+
+
+async def stream_run(
+    run_id: str,
+    item: VerifaiInput,
+    encoder: StreamEncoder,
+    offset: int | None = None,
+    timeout: float | None = None
+) -> AsyncIterator[bytes]:
+    """Frames of a run for one client. A new run identical (same mode and normalized text) to one in flight
+    follows that one instead, from its first frame. With an offset, the logged frames from that offset are
+    replayed first, then the client follows the run if it is streaming, or it continues from its last checkpoint.
+    A run is cancelled once no client follows it anymore, or after `timeout` seconds"""
+    key = _coalescing_key(item)
+    if offset is None and key in _coalesced:
+        run_id, offset = _coalesced[key], 0
+        logger.info("verifai run %s joined by an identical request", run_id)
+    subscription = _start(run_id, item, timeout) if offset is None else None
+    last_seq = -1
+    try:
+        if offset is not None:
+            log = get_run_log()
+            while True:
+                # Subscribed before reading the log, every frame is either logged already or comes through the subscription
+                if subscription is None and run_id in _broadcasts:
+                    subscription = _broadcasts[run_id].subscribe()
+                for seq, name, data in await asyncio.to_thread(log.events, run_id):
+                    if seq > last_seq:
+                        frame = encoder.replay(seq, name, data)
+                        last_seq = seq
+                        if seq >= offset:
+                            yield frame
+                if subscription is not None:
+                    break
+                if (await asyncio.to_thread(log.run, run_id))["status"] == "done":
+                    return
+                if run_id not in _broadcasts:
+                    subscription = _start(run_id, item, timeout, resumed=True)
+                    break
+                # Resumed by another client meanwhile, read the log again once subscribed
+
+        async for seq, name, data in subscription.follow():
+            if seq > last_seq and seq >= (offset or 0):
+                yield encoder.replay(seq, name, data)
+        if subscription.dropped:
+            logger.warning("verifai run %s client dropped, it fell %d frames behind", run_id, get_settings().STREAM_QUEUE_SIZE)
+    finally:
+        if subscription is not None:
+            subscription.leave()
+
+
+def _coalescing_key(item: VerifaiInput) -> tuple[str, str]:
+    return item.mode.value, normalize_text(item.input_text)
+
+
+def _start(run_id: str, item: VerifaiInput, timeout: float | None, resumed: bool = False) -> Subscription:
+    """Run the graph in the background, returns the subscription of the client starting it"""
+    settings = get_settings()
+    broadcast = Broadcast(max_queue=settings.STREAM_QUEUE_SIZE, overflow=settings.STREAM_OVERFLOW)
+    subscription = broadcast.subscribe()
+    _broadcasts[run_id] = broadcast
+    if not resumed:
+        _coalesced[_coalescing_key(item)] = run_id
+    task = asyncio.create_task(_produce(run_id, item, broadcast, resumed, timeout), name=f"verifai-run-{run_id}")
+    # Cancelling the task cancels every branch of the graph and their provider calls, the run stays resumable
+    broadcast.on_idle = task.cancel
+    return subscription
+
+
+async def _produce(run_id: str, item: VerifaiInput, broadcast: Broadcast, resumed: bool, timeout: float | None):
+    log = get_run_log()
+    encoder = StreamEncoder()
+    tasks = RunTasks()
+    current_tasks.set(tasks)
+    try:
+        async with asyncio.timeout(timeout):
+            await _run_graph(run_id, item, encoder, broadcast, resumed)
+    except TimeoutError:
+        logger.warning("verifai run %s stopped at its %.0fs deadline", run_id, timeout)
+        encoder.event("error", {"detail": "Run deadline exceeded"})
+        await _publish(log, run_id, encoder, broadcast)
+        await asyncio.to_thread(log.set_status, run_id, "expired")
+    except Exception:
+        logger.exception("verifai run %s failed", run_id)
+        encoder.event("error", {"detail": "Run failed"})
+        await _publish(log, run_id, encoder, broadcast)
+    finally:
+        tasks.cancel()  # Work started ahead of the graph steps, e.g. search queries of claims not researched yet
+        _broadcasts.pop(run_id, None)
+        if _coalesced.get(_coalescing_key(item)) == run_id:
+            del _coalesced[_coalescing_key(item)]
+        await broadcast.close()
+
+
+async def _run_graph(run_id: str, item: VerifaiInput, encoder: StreamEncoder, broadcast: Broadcast, resumed: bool):
+    log = get_run_log()
+    if not resumed:
+        await asyncio.to_thread(log.create, run_id, item.model_dump(mode="json"))
+        encoder.event("start", {"protocol": PROTOCOL_VERSION, "run_id": run_id})
+        await _publish(log, run_id, encoder, broadcast)
+    else:
+        for seq, name, data in await asyncio.to_thread(log.events, run_id):
+            encoder.replay(seq, name, data)  # Continue the sequence and evidence ids of the logged frames
+        encoder.event("resumed", {"run_id": run_id})
+        await _publish(log, run_id, encoder, broadcast)
+
+    graph = get_graph()
+    config = {"configurable": {"thread_id": run_id}}
+    if resumed and graph.checkpointer is not None:
+        # Steps that completed while the stream was down are not replayed, their results are in the checkpoint
+        values = (await graph.aget_state(config)).values
+        if values:
+            encoder.event("snapshot", {key: values.get(key, []) for key in ("claims", "verdicts", "deferred_claims")})
+            await _publish(log, run_id, encoder, broadcast)
+
+    current_request_id.set(run_id)
+    stats = RequestStats(mode=item.mode.value)
+    current_stats.set(stats)
+    logger.info("verifai run %s, mode: %s, input length: %d, resumed: %s", run_id, item.mode.value, len(item.input_text), resumed)
+    config["callbacks"] = [UsageCallbackHandler(stats)]
+    # astream returns a tuple,
+    # * _ is a dict indicating namespace graph (main is (), subgraph is {"research_team": <id>}),
+    # * mode is the stream mode (ie. either messages or custom)
+    # * data is the stream payload.
+    #    * Messages event are a tuple with AIMessageChunk object and langgraph node metadata,
+    #    * Custom events are the payload from the writer function
+    async for _, mode, chunk in graph.astream(
+        await resume_input(graph, config, item.input_text),
+        config=config,
+        subgraphs=True, # Needed to stream subgraphs events
+        stream_mode=["messages", "custom"], # Messages for report tokens and custom_data for node custom events
+        context=get_config(item.mode)
+    ):
+        if mode == "messages":
+            msg, metadata = chunk
+            if (
+                isinstance(metadata, dict)
+                and metadata.get("langgraph_node") == "generate_report"
+                and isinstance(msg, AIMessageChunk)
+                and msg.content
+            ):
+                if encoder.token(msg.content):
+                    await _publish(log, run_id, encoder, broadcast)
+
+        elif mode == "custom":
+            logger.debug("verifai run %s event: %s", run_id, chunk.get("event"))
+            encoder.event(chunk["event"], chunk.get("payload"))
+            await _publish(log, run_id, encoder, broadcast)
+
+    summary = stats.finish()
+    logger.info("verifai run %s done in %.2fs, cost: $%.4f", run_id, summary["duration_seconds"], summary["cost_usd"])
+    encoder.event("stats", summary)
+    await _publish(log, run_id, encoder, broadcast)
+    encoder.event("done")
+    frames = encoder.drain()
+    await asyncio.to_thread(log.append, run_id, frames)
+    await asyncio.to_thread(log.set_status, run_id, "done")
+    await forget(graph, run_id)
+    await broadcast.publish(frames)
+
+
+async def _publish(log: RunLog, run_id: str, encoder: StreamEncoder, broadcast: Broadcast):
+    """Log the frames just encoded before they are sent, so that a replay never misses a frame a client got"""
+    frames = encoder.drain()
+    await asyncio.to_thread(log.append, run_id, frames)
+    await broadcast.publish(frames)
@@ -0,0 +1,55 @@
+"""Process-wide scheduling of the LLM and search calls made by every Verifai request"""
+
+import time
+from contextlib import asynccontextmanager
+
+from api.common.limiter import ProviderLimiter
+from api.common.metrics import registry
+from api.settings import get_settings
+from .instrumentation import record_provider_call
+
+_limiters: dict[str, ProviderLimiter] = {}
+
+PROVIDER_IN_FLIGHT = registry.gauge("verifai_provider_in_flight", "External calls in flight", ["provider"])
+PROVIDER_QUEUE_DEPTH = registry.gauge("verifai_provider_queue_depth", "External calls waiting for a slot", ["provider"])
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """Limiter of a provider. Providers without dedicated settings share the OpenAI limits"""
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        rate, max_in_flight = _provider_limits(provider)
+        limiter = ProviderLimiter(provider, rate=rate, burst=max(int(rate), 1), max_in_flight=max_in_flight)
+        _limiters[provider] = limiter
+    return limiter
+
+
+@asynccontextmanager
+async def provider_call(provider: str):
+    """Slot for one external call to a provider, recording its queue wait and duration"""
+    async with get_limiter(provider).slot() as queue_wait:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            record_provider_call(provider, queue_wait, time.perf_counter() - started)
+
+
+def scheduler_stats() -> dict:
+    return {provider: limiter.stats() for provider, limiter in _limiters.items()}
+
+
+def _collect_gauges():
+    for provider, stats in scheduler_stats().items():
+        PROVIDER_IN_FLIGHT.set(stats["in_flight"], provider=provider)
+        PROVIDER_QUEUE_DEPTH.set(stats["queue_depth"], provider=provider)
+
+
+registry.on_collect(_collect_gauges)
+
+
+def _provider_limits(provider: str) -> tuple[float, int]:
+    settings = get_settings()
+    if provider == "tavily":
+        return settings.TAVILY_RATE_LIMIT, settings.TAVILY_MAX_IN_FLIGHT
+    return settings.OPENAI_RATE_LIMIT, settings.OPENAI_MAX_IN_FLIGHT
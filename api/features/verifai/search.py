@@ -0,0 +1,69 @@
+"""Async web search backend for the research agents"""
+
+import asyncio
+from functools import lru_cache
+
+import httpx
+
+from api.common.http import get_http_client
+from api.common.text import normalize_text
+from api.settings import get_settings
+from .cache import get_cache, get_single_flight
+from .scheduler import provider_call
+
+# Replaces the Tavily client, e.g. with the benchmark replay backend
+_search_client = None
+
+
+@lru_cache
+def _tavily_client():
+    from tavily import AsyncTavilyClient  # Deferred to the first search
+
+    return AsyncTavilyClient(api_key=get_settings().TAVILY_API_KEY, client=get_http_client("tavily"))
+
+
+def get_search_client():
+    """Process-wide async search client, shared by every request so its connection pool stays warm"""
+    return _search_client if _search_client is not None else _tavily_client()
+
+
+def clear_search_client():
+    """Drop the Tavily client, e.g. once the pooled HTTP clients are closed"""
+    _tavily_client.cache_clear()
+
+
+def set_search_client(client):
+    """Serve every search with `client` (same `search` coroutine as AsyncTavilyClient), None restores Tavily"""
+    global _search_client
+    _search_client = client
+
+
+async def search(query: str, max_results: int, search_depth: str, timeout: float) -> dict:
+    """Run a single search query. A query that times out yields no results instead of failing the claim"""
+    cache = get_cache()
+    cache_key = (normalize_text(query), max_results, search_depth)
+    cached = await cache.get("search", *cache_key)
+    if cached is not None:
+        return cached
+
+    async def fetch() -> dict:
+        from tavily.errors import TimeoutError as TavilyTimeoutError  # Deferred like the client
+
+        try:
+            async with provider_call("tavily"):
+                results = await asyncio.wait_for(
+                    get_search_client().search(
+                        query=query,
+                        max_results=max_results,
+                        search_depth=search_depth,
+                        timeout=timeout
+                    ),
+                    timeout=timeout
+                )
+        except (TimeoutError, TavilyTimeoutError, httpx.TimeoutException):  # Ours, Tavily's and a replacement client's
+            return {"query": query, "results": []}
+        await cache.set("search", results, *cache_key)
+        return results
+
+    # Requests researching the same claim at the same time share the search
+    return await get_single_flight().do("search", fetch, *cache_key)
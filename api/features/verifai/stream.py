@@ -0,0 +1,124 @@
+"""Encoding of the /verifai/run stream (protocol version 3).
+
+Every frame is a `{"seq": n, "event": name, "payload": ...}` object, one JSON line per frame (NDJSON)
+or one `id:`/`event:`/`data:` message (SSE). Events only carry what is new: an evidence is sent in full,
+with an id, the first time it appears, and as `{"ref": id}` afterwards. Report tokens are coalesced into
+`tokens` frames covering a short time window. Identical requests in flight share one run: a request
+joining it gets every frame from its `start`, which carries the run id of the first request.
+
+A dropped stream is resumed from the `seq` following the last frame received. The resumed stream then
+sends a `snapshot` of the claims, verdicts and deferred claims saved in the last checkpoint, which covers
+the steps that completed while no one was listening. Events of the steps run again after the checkpoint
+come again: a `generate_report_start` frame restarts the report tokens. A stream ending without a `done`
+frame (client disconnected, or fallen too far behind) is resumed the same way.
+
+Depending on the mode's report_mode, the report comes as `tokens` frames (full), as a `report_section`
+frame per claim followed by `tokens` frames of the summary (sections), or as `report_section` frames and
+a `report_summary` frame (template).
+
+Claims come one by one as `extract_claims_item` frames while the extraction is generated. A
+`verify_evidence_status_{i}` frame carries the status and confidence of claim i as soon as the model
+wrote them: it is preliminary, the `verify_evidence_end_{i}` frame carries the verdict. An
+`extract_claims_capped` frame tells that the text had more claims than a request may check (MAX_CLAIMS).
+"""
+
+import json
+import time
+from typing import Any, Literal
+
+from pydantic_core import to_json
+
+from .models import Evidence, Verdict
+
+PROTOCOL_VERSION = 3
+
+
+class StreamEncoder:
+    def __init__(self, format: Literal["ndjson", "sse"] = "ndjson", token_window: float = 0.05, max_token_chars: int = 1024):
+        self.format = format
+        self.token_window = token_window  # Seconds of tokens sent in a single frame
+        self.max_token_chars = max_token_chars
+        self.seq = 0  # Sequence number of the next frame
+        self._evidence_ids: dict[tuple[str, str], int] = {}
+        self._tokens: list[str] = []
+        self._token_chars = 0
+        self._tokens_since = 0.0
+        self._encoded: list[tuple[int, str, bytes]] = []
+
+    def event(self, name: str, payload: Any = None) -> bytes:
+        """Frame of a node event, preceded by the tokens still buffered so that frames keep their order"""
+        return self.flush() + self._frame(name, to_json(self._compact(payload)))
+
+    def replay(self, seq: int, name: str, data: bytes) -> bytes:
+        """Frame of an already sent event, continuing its sequence and evidence ids"""
+        self.seq = seq + 1
+        self._learn(json.loads(data))
+        return self._format(seq, name, data)
+
+    def drain(self) -> list[tuple[int, str, bytes]]:
+        """(seq, event, payload JSON) of the frames encoded since the last call, to be logged for replay"""
+        encoded, self._encoded = self._encoded, []
+        return encoded
+
+    def token(self, content: str) -> bytes:
+        """Buffer a report token, returns a `tokens` frame once the time window or size limit is reached"""
+        if not self._tokens:
+            self._tokens_since = time.monotonic()
+        self._tokens.append(content)
+        self._token_chars += len(content)
+        if self._token_chars >= self.max_token_chars or time.monotonic() - self._tokens_since >= self.token_window:
+            return self.flush()
+        return b""
+
+    def flush(self) -> bytes:
+        if not self._tokens:
+            return b""
+        frame = self._frame("tokens", to_json("".join(self._tokens)))
+        self._tokens = []
+        self._token_chars = 0
+        return frame
+
+    def _frame(self, name: str, data: bytes) -> bytes:
+        seq = self.seq
+        self.seq += 1
+        self._encoded.append((seq, name, data))
+        return self._format(seq, name, data)
+
+    def _format(self, seq: int, name: str, data: bytes) -> bytes:
+        if self.format == "sse":
+            return b"id: %d\nevent: %s\ndata: %s\n\n" % (seq, name.encode(), data)
+        return b'{"seq":%d,"event":%s,"payload":%s}\n' % (seq, to_json(name), data)
+
+    def _compact(self, value: Any) -> Any:
+        """Replace evidence already sent by references. Other values are left to the serializer as is"""
+        if isinstance(value, Evidence):
+            return self._evidence(value)
+        if isinstance(value, Verdict):
+            return {
+                **value.model_dump(exclude={"evidence_used"}),
+                "evidence_used": [self._evidence(evidence) for evidence in value.evidence_used],
+            }
+        if isinstance(value, dict):
+            return {key: self._compact(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._compact(item) for item in value]
+        return value
+
+    def _evidence(self, evidence: Evidence) -> dict:
+        key = (evidence.source, evidence.snippet)
+        evidence_id = self._evidence_ids.get(key)
+        if evidence_id is not None:
+            return {"ref": evidence_id}
+        evidence_id = self._evidence_ids[key] = len(self._evidence_ids)
+        return {"id": evidence_id, **evidence.model_dump()}
+
+    def _learn(self, value: Any):
+        """Register the evidence ids of a replayed payload"""
+        if isinstance(value, dict):
+            if "id" in value and "source" in value and "snippet" in value:
+                self._evidence_ids[value["source"], value["snippet"]] = value["id"]
+            for item in value.values():
+                self._learn(item)
+        elif isinstance(value, list):
+            for item in value:
+                self._learn(item)
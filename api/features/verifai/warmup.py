@@ -0,0 +1,41 @@
+"""Provider SDKs and clients loaded ahead of the first request"""
+
+import importlib
+from typing import get_args
+
+from .config import get_config
+from .llm import clear_models, get_chat_model, provider_of
+from .models import ModelNode, VerifaiModeEnum
+from .search import clear_search_client, get_search_client
+
+
+def _model_names() -> set[tuple[str, float]]:
+    names = set()
+    for mode in VerifaiModeEnum:
+        config = get_config(mode)
+        names.update((config.model_for(node), config.temperature) for node in get_args(ModelNode))
+        if config.escalation_model is not None:
+            names.add((config.escalation_model, config.temperature))
+    return names
+
+
+def preload():
+    """Import the provider SDKs of every mode without creating any client, e.g. before forking workers"""
+    for provider in {provider_of(model_name) for model_name, _ in _model_names()}:
+        importlib.import_module(f"langchain_{provider}")  # Integration package loaded by init_chat_model
+    importlib.import_module("tavily")
+
+
+def warm_up():
+    """Build the shared chat models of every mode and the search client. Blocking, call it through `asyncio.to_thread`"""
+    preload()
+    for model_name, temperature in _model_names():
+        get_chat_model(model_name, temperature)
+    get_search_client()
+
+
+def release_clients():
+    """Drop the shared chat models and search client, built again on their next use. Call it once the pooled
+    HTTP clients they hold are closed"""
+    clear_models()
+    clear_search_client()
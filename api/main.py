@@ -1,10 +1,38 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
+from .common.http import close_http_clients
+from .common.log import setup_logging
+from .common.metrics import registry
+from .settings import get_settings
 from .middlewares import applyCors
-from .features import verifai_router
+from .features import verifai_router, get_batch_workers, get_diagrams, checkpointing, release_clients, warm_up
+
+
+settings = get_settings()
+setup_logging(settings.LOG_LEVEL, settings.LOG_SAMPLE_RATE)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with checkpointing():  # Compiles the graph served by this worker
+        await asyncio.to_thread(get_diagrams)
+        if settings.WARM_UP:
+            await asyncio.to_thread(warm_up)
+        batch_workers = get_batch_workers()
+        await batch_workers.start()
+        yield
+        await batch_workers.stop()
+    await close_http_clients()
+    release_clients()  # They hold the closed HTTP clients, e.g. a test client running the lifespan again
+
 
 app = FastAPI(
-    root_path="/api"
+    root_path="/api",
+    lifespan=lifespan
 )
 
 applyCors(app)
@@ -14,4 +42,10 @@ applyCors(app)
 def health():
     return {"status": "ok"}
 
-app.include_router(router=verifai_router)
\ No newline at end of file
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+app.include_router(router=verifai_router)
@@ -0,0 +1,99 @@
+"""Serve the API with worker processes forked from a parent that imported it once (preload).
+
+The workers share the imported modules with the parent copy-on-write, instead of each importing them again
+as with `uvicorn --workers` (which spawns fresh interpreters). Every worker runs the app lifespan on its own:
+checkpointer, batch workers and provider clients are never shared across processes.
+
+    python -m api.serve --workers 4
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+
+import uvicorn
+
+from api.common.log import setup_logging
+from api.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m api.serve", description="Serve the API with preloaded forked workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    return parser.parse_args()
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.create_server((host, port), backlog=2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket):
+    os.setpgrp()  # Terminal signals go to the parent only, it stops the workers itself
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    gc.enable()
+    # The log listener thread of the parent is not forked, records would pile up in a queue no thread reads
+    settings = get_settings()
+    setup_logging(settings.LOG_LEVEL, settings.LOG_SAMPLE_RATE)
+    uvicorn.Server(uvicorn.Config(app)).run(sockets=[sock])
+
+
+def main():
+    if not hasattr(os, "fork"):
+        raise SystemExit("Preloaded workers need fork(), use `uvicorn api.main:app --workers N` on this platform")
+    args = parse_args()
+
+    from api.main import app
+    from api.features import preload
+    preload()
+    sock = _bind(args.host, args.port)
+    # Objects allocated so far are never collected: collections would write to their pages and copy them in every worker
+    gc.disable()
+    gc.freeze()
+
+    workers: set[int] = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                _run_worker(app, sock)
+                code = 0
+            except Exception:
+                logger.exception("Worker failed")
+            finally:
+                os._exit(code)
+        workers.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(args.workers):
+        spawn()
+    logger.info("Serving on http://%s:%d with %d preloaded workers", args.host, args.port, args.workers)
+    while workers:
+        pid, status = os.wait()
+        workers.discard(pid)
+        if not stopping:
+            logger.warning("Worker %d exited with status %d, starting another one", pid, os.waitstatus_to_exitcode(status))
+            spawn()
+
+
+if __name__ == "__main__":
+    main()
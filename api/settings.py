@@ -1,22 +1,59 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
+from typing import Literal
 
 class Settings(BaseSettings):
     app_name: str = "Verifai API"
     OPENAI_API_KEY: str =""
     TAVILY_API_KEY: str = ""
 
+    CACHE_ENABLED: bool = True
+    CACHE_PATH: str = ".cache/verifai.sqlite3" # Empty to keep the cache in memory only
+    CACHE_MAX_ENTRIES: int = 2048
+    CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+
+    # Process-wide provider limits, shared by every request (rate in calls per second, 0 for no rate limit)
+    OPENAI_RATE_LIMIT: float = 20.0
+    OPENAI_MAX_IN_FLIGHT: int = 32
+    TAVILY_RATE_LIMIT: float = 10.0
+    TAVILY_MAX_IN_FLIGHT: int = 16
+
+    EVIDENCE_INDEX_ENABLED: bool = True
+    EVIDENCE_INDEX_PATH: str = ".cache/verifai_evidence.sqlite3"
+    EVIDENCE_INDEX_MAX_ENTRIES: int = 200_000
+
+    # Hard limits of a fact-check request, whatever its mode
+    MAX_INPUT_CHARS: int = 200_000
+    MAX_CLAIMS: int = 500 # Claims extracted past it are dropped, mode budgets (max_claims) apply to the ones kept
+
+    # Checkpoints and stream logs of the runs, kept for resuming dropped streams
+    RUNS_PATH: str = ".cache/verifai_runs.sqlite3"
+    RUNS_TTL_SECONDS: int = 24 * 3600
+    RUN_TIMEOUT_SECONDS: float = 600.0 # Longest a run may take, requests can ask for less
+    STREAM_QUEUE_SIZE: int = 256 # Frames buffered per client
+    STREAM_OVERFLOW: Literal["block", "drop"] = "drop" # Slow client: hold the run back, or end its stream (it resumes from the log)
+
+    # Batch fact-check jobs
+    JOBS_PATH: str = ".cache/verifai_jobs.sqlite3"
+    JOBS_WORKERS: int = 8 # Documents fact checked at once across every batch job
+
+    # Import the provider SDKs and build their clients at startup, instead of on the first request
+    WARM_UP: bool = True
+
+    LOG_LEVEL: str = "INFO"
+    LOG_SAMPLE_RATE: float = 1.0 # Share of the records below WARNING that get logged
+
     model_config = SettingsConfigDict(env_file=".env")
 
 
 @lru_cache
-def get_settings():
+def get_settings() -> Settings:
+    """Settings read and validated once per process"""
     settings = Settings()
 
     if (settings.OPENAI_API_KEY == ""):
         raise ValueError("OPENAI_API_KEY must be set")
     if (settings.TAVILY_API_KEY == ""):
         raise ValueError("TAVILY_API_KEY must be set")
-    
 
-    return Settings()
\ No newline at end of file
+    return settings